@@ -11,7 +11,8 @@ from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from textblob import TextBlob  # For sentiment analysis
+from sentiment import score_reviews
+from verdict_engine import THRESHOLD, judge_scores
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -312,35 +313,15 @@ class FlipkartReviewScraper:
         """Analyze sentiment and determine if the product is worth buying"""
         if not reviews:
             return "No reviews available for analysis"
-            
-        positive_count = 0
-        negative_count = 0
-        neutral_count = 0
         
         logger.info("Performing sentiment analysis...")
-        for review in reviews:
-            sentiment = TextBlob(review).sentiment.polarity
-            if sentiment > 0.1:
-                positive_count += 1
-            elif sentiment < -0.1:
-                negative_count += 1
-            else:
-                neutral_count += 1
-        
-        total_reviews = len(reviews)
-        positive_percentage = (positive_count / total_reviews * 100) if total_reviews > 0 else 0
-        negative_percentage = (negative_count / total_reviews * 100) if total_reviews > 0 else 0
-        neutral_percentage = (neutral_count / total_reviews * 100) if total_reviews > 0 else 0
-        
+        scores = [row['score'] for row in score_reviews(reviews)]
+        verdict = judge_scores([scores], THRESHOLD)[0]
+        positive_percentage, neutral_percentage, negative_percentage = (
+            count / verdict.total * 100 for count in (verdict.positive, verdict.neutral, verdict.negative)
+        )
         logger.info(f"Sentiment analysis results: Positive: {positive_percentage:.1f}%, Negative: {negative_percentage:.1f}%, Neutral: {neutral_percentage:.1f}%")
-        
-        # Determine final decision
-        if positive_percentage >= 60:
-            return f"Buy ✅ ({positive_count}/{total_reviews} or {positive_percentage:.1f}% reviews are positive)"
-        elif negative_percentage >= 40:
-            return f"Don't Buy ❌ ({negative_count}/{total_reviews} or {negative_percentage:.1f}% reviews are negative)"
-        else:
-            return f"Consider with Caution ⚠️ (Mixed reviews - {positive_percentage:.1f}% positive, {negative_percentage:.1f}% negative, {neutral_percentage:.1f}% neutral)"
+        return verdict.text
     
     def extract_product_info(self):
         """Extract basic product information like name and price"""
@@ -9,7 +9,8 @@ from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from textblob import TextBlob  # Import TextBlob for sentiment analysis
+from sentiment import score_reviews
+from verdict_engine import MAJORITY, judge_scores
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -101,21 +102,8 @@ class AmazonReviewScraper:
 
     def analyze_sentiment(self, reviews):
         """Analyze sentiment and determine if the product is worth buying"""
-        positive_count = 0
-        negative_count = 0
-
-        for review in reviews:
-            sentiment = TextBlob(review).sentiment.polarity  # Get sentiment score
-            if sentiment > 0:
-                positive_count += 1
-            elif sentiment < 0:
-                negative_count += 1
-
-        # Determine final decision
-        if positive_count > negative_count:
-            return "Buy ✅ (Majority of reviews are positive)"
-        else:
-            return "Don't Buy ❌ (Majority of reviews are negative)"
+        scores = [row['score'] for row in score_reviews(reviews)]
+        return judge_scores([scores], MAJORITY)[0].text
 
     def scrape_review_titles(self, product_url, max_pages=2):
         """Scrape up to max_pages review titles from Amazon and analyze sentiment"""
@@ -0,0 +1,377 @@
+import sys
+import time
+import tracemalloc
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree, html as lxml_html
+from parser_backends import available_backends, get_backend
+from price_utils import normalize_price
+from selector_stats import selector_registry
+
+AMAZON_HOME = 'https://www.amazon.in'
+
+# Bytes fed to the incremental parser per step in streaming mode
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Precompiled once at import; evaluated relative to each result card
+# Kept in strict order: the fallbacks also match ads and layout containers,
+# so they must never be promoted above the result-card selector
+CARD_XPATHS = [
+    etree.XPath('//div[@data-component-type="s-search-result"]'),
+    etree.XPath('//div[contains(concat(" ", normalize-space(@class), " "), " s-result-item ")]'),
+    etree.XPath('//div[contains(concat(" ", normalize-space(@class), " "), " sg-col-inner ")]'),
+]
+
+TITLE_XPATHS = [
+    etree.XPath('.//h2//a[contains(concat(" ", normalize-space(@class), " "), " a-link-normal ")]//span'),
+    etree.XPath('.//h2//span[contains(concat(" ", normalize-space(@class), " "), " a-text-normal ")]'),
+    etree.XPath('.//h2'),
+]
+
+LINK_XPATHS = [
+    etree.XPath('.//h2//a/@href'),
+    etree.XPath('.//a[contains(concat(" ", normalize-space(@class), " "), " a-link-normal ")]/@href'),
+]
+
+PRICE_XPATHS = [
+    etree.XPath('.//span[contains(concat(" ", normalize-space(@class), " "), " a-price-whole ")]'),
+    etree.XPath('.//span[contains(concat(" ", normalize-space(@class), " "), " a-price ")]//span[@aria-hidden="true"]'),
+    etree.XPath('.//span[contains(concat(" ", normalize-space(@class), " "), " a-price ")]'),
+    etree.XPath('.//span[contains(concat(" ", normalize-space(@class), " "), " a-offscreen ")]'),
+]
+
+
+def extract_price(card, backend=None):
+    """Extract the price from a result card parsed by a parser backend"""
+    backend = get_backend(backend)
+    price_selectors = [
+        'span.a-price-whole',
+        'span.a-price span[aria-hidden="true"]',
+        'span.a-price',
+        'span.a-offscreen'
+    ]
+
+    for selector in price_selectors:
+        price_elem = backend.select_one(card, selector)
+        if price_elem is not None:
+            price = normalize_price(backend.text(price_elem))
+            if price != float('inf'):
+                return price
+    return float('inf')  # Return infinity for items with no price
+
+
+def _text(elem):
+    # itertext works for both lxml.html and plain etree elements (pull parser)
+    return ''.join(elem.itertext())
+
+
+def _first_text(card, xpaths):
+    for xpath in xpaths:
+        for elem in xpath(card):
+            text = _text(elem).strip()
+            if text:
+                return text
+    return ''
+
+
+def _first_value(card, xpaths):
+    for xpath in xpaths:
+        values = xpath(card)
+        if values:
+            return str(values[0])
+    return ''
+
+
+def extract_card(card):
+    """Return [title, price, link] for an lxml result card, or None if incomplete"""
+    title = _first_text(card, TITLE_XPATHS)
+    if not title:
+        return None
+
+    link = _first_value(card, LINK_XPATHS)
+    if not link:
+        return None
+    if not link.startswith('http'):
+        link = AMAZON_HOME + link
+
+    price = float('inf')
+    for xpath in PRICE_XPATHS:
+        for elem in xpath(card):
+            price = normalize_price(_text(elem))
+            break
+        if price != float('inf'):
+            break
+
+    if price == float('inf'):
+        return None
+    return [title, price, link]
+
+
+def iter_streamed_cards(page_html, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Feed the page to an incremental lxml parser and yield each search-result
+    card as soon as its closing tag is seen. Finished cards are cleared so
+    the partial tree never holds more than the card being built.
+    """
+    parser = etree.HTMLPullParser(events=('end',), tag='div')
+    for offset in range(0, len(page_html), chunk_size):
+        parser.feed(page_html[offset:offset + chunk_size])
+        for _, elem in parser.read_events():
+            if elem.get('data-component-type') != 's-search-result':
+                continue
+            yield elem
+            elem.clear()
+            # Drop already processed siblings that are still attached to the parent
+            parent = elem.getparent()
+            while parent is not None and elem.getprevious() is not None:
+                del parent[0]
+    parser.close()
+
+
+class _CardTarget:
+    """
+    lxml parser target that only builds subtrees under search-result cards.
+    Everything outside a card is dropped as it is parsed, so no page tree is
+    ever allocated; each finished card is handed to on_card and released.
+    """
+
+    def __init__(self, on_card):
+        self.on_card = on_card
+        self.builder = None
+        self.depth = 0
+
+    def start(self, tag, attrib):
+        if self.builder is None:
+            if tag != 'div' or attrib.get('data-component-type') != 's-search-result':
+                return
+            self.builder = etree.TreeBuilder()
+        self.depth += 1
+        self.builder.start(tag, dict(attrib))
+
+    def end(self, tag):
+        if self.builder is None:
+            return
+        self.builder.end(tag)
+        self.depth -= 1
+        if self.depth == 0:
+            card = self.builder.close()
+            self.builder = None
+            self.on_card(card)
+            card.clear()
+
+    def data(self, data):
+        if self.builder is not None:
+            self.builder.data(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return None
+
+
+def iter_scoped_items(page_html, limit=None, chunk_size=STREAM_CHUNK_SIZE):
+    """Parse only result-card subtrees and return (cards_seen, items)"""
+    items = []
+    seen = [0]
+
+    def on_card(card):
+        seen[0] += 1
+        if limit and seen[0] > limit:
+            return
+        item = extract_card(card)
+        if item:
+            items.append(item)
+
+    parser = etree.HTMLParser(target=_CardTarget(on_card))
+    for offset in range(0, len(page_html), chunk_size):
+        parser.feed(page_html[offset:offset + chunk_size])
+        if limit and seen[0] >= limit:
+            break
+    parser.close()
+    return seen[0], items
+
+
+def parse_product_cards(page_html, limit=10, mode='tree'):
+    """
+    Extract [title, price, link] for the first `limit` Amazon result cards
+
+    Uses precompiled lxml XPath expressions, so each card costs a handful of
+    C-level tree walks instead of soupsieve selector matching.
+
+    Args:
+        page_html: Search results page source
+        limit: Number of result cards to look at, or None for all of them
+        mode: 'tree' parses the whole page first; 'stream' parses it
+            incrementally and stops feeding once `limit` cards are complete,
+            falling back to 'tree' if no card is recognised; 'scoped'
+            builds only the result-card subtrees and releases each one
+            after extraction, also falling back to 'tree'
+    """
+    if mode == 'scoped':
+        seen, items = iter_scoped_items(page_html, limit)
+        if seen:
+            return items
+
+    if mode == 'stream':
+        items = []
+        seen = 0
+        for card in iter_streamed_cards(page_html):
+            seen += 1
+            item = extract_card(card)
+            if item:
+                items.append(item)
+            if limit and seen >= limit:
+                break
+        if seen:
+            return items
+
+    tree = lxml_html.fromstring(page_html)
+
+    _, prod_cards = selector_registry.first_match(
+        'amazon', 'card_xpaths', CARD_XPATHS, lambda xpath: xpath(tree)
+    )
+    prod_cards = prod_cards or []
+
+    items = []
+    for card in prod_cards[:limit]:
+        item = extract_card(card)
+        if item:
+            items.append(item)
+
+    return items
+
+
+def _css_cards(document, backend, limit):
+    selectors = [
+        'div[data-component-type="s-search-result"]',
+        'div.s-result-item',
+        'div.sg-col-inner'
+    ]
+
+    prod_cards = []
+    for selector in selectors:
+        prod_cards = backend.select(document, selector)
+        if prod_cards:
+            break
+
+    items = []
+    for card in prod_cards[:limit]:
+        title_elem = None
+        for selector in ('h2 a.a-link-normal span', 'h2 span.a-text-normal', 'h2'):
+            title_elem = backend.select_one(card, selector)
+            if title_elem is not None:
+                break
+        if title_elem is None:
+            continue
+        title = backend.text(title_elem)
+
+        link_elem = backend.select_one(card, 'h2 a')
+        if link_elem is None:
+            link_elem = backend.select_one(card, 'a.a-link-normal')
+        if link_elem is None:
+            continue
+        link = backend.attr(link_elem, 'href', '')
+        if not link.startswith('http'):
+            link = AMAZON_HOME + link
+
+        price = extract_price(card, backend)
+        if title and link and price != float('inf'):
+            items.append([title, price, link])
+
+    return items
+
+
+def parse_product_cards_css(page_html, limit=10, backend=None):
+    """
+    Extract [title, price, link] with CSS selectors through a parser backend
+
+    Args:
+        page_html: Search results page source
+        limit: Number of result cards to look at, or None for all of them
+        backend: Parser backend name ('bs4', 'lxml', 'selectolax'); defaults
+            to parser_backends.PARSER_BACKEND
+    """
+    backend = get_backend(backend)
+    document = backend.parse(page_html)
+    items = _css_cards(document, backend, limit)
+    backend.release(document)
+    return items
+
+
+def parse_product_cards_bs4(page_html, limit=10, scoped=False):
+    """
+    BeautifulSoup implementation kept as the reference for benchmarks
+
+    With scoped=True a SoupStrainer limits the tree to result cards and the
+    soup is decomposed once the cards have been read.
+    """
+    if not scoped:
+        return parse_product_cards_css(page_html, limit, backend='bs4')
+
+    backend = get_backend('bs4')
+    only_cards = SoupStrainer('div', attrs={'data-component-type': 's-search-result'})
+    soup = BeautifulSoup(page_html, 'lxml', parse_only=only_cards)
+    items = _css_cards(soup, backend, limit)
+    backend.release(soup)
+    return items
+
+
+def benchmark(path='amazon_search_page.html', runs=20):
+    """Time each parse mode against the BeautifulSoup reference on a saved page"""
+    with open(path, encoding='utf-8') as f:
+        page_html = f.read()
+
+    engines = [
+        ('beautifulsoup', parse_product_cards_bs4),
+        ('bs4-scoped', lambda page: parse_product_cards_bs4(page, scoped=True)),
+    ]
+    # Other CSS backends are only timed when their packages are installed
+    engines += [
+        (f"css-{name}", lambda page, name=name: parse_product_cards_css(page, backend=name))
+        for name in available_backends() if name != 'bs4'
+    ]
+    engines += [
+        ('lxml', parse_product_cards),
+        ('lxml-stream', lambda page: parse_product_cards(page, mode='stream')),
+        ('lxml-scoped', lambda page: parse_product_cards(page, mode='scoped')),
+    ]
+
+    results = {}
+    counts = {}
+    for name, parser in engines:
+        start = time.perf_counter()
+        for _ in range(runs):
+            items = parser(page_html)
+        elapsed = (time.perf_counter() - start) / runs * 1000
+
+        # tracemalloc only sees Python-level allocations, which is where
+        # BeautifulSoup keeps its tree; lxml's C tree is not counted
+        tracemalloc.start()
+        parser(page_html)
+        peak = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+
+        results[name] = elapsed
+        counts[name] = len(items)
+        print(f"{name:>14}: {elapsed:8.2f} ms/page, {peak:9.1f} KiB peak, {len(items)} products")
+
+    print(f"{'speedup':>14}: {results['beautifulsoup'] / results['lxml']:8.1f}x")
+    if not counts['beautifulsoup']:
+        print(f"{'note':>14}: {path} has no Amazon result cards, the timings above only measure parsing overhead")
+
+    # lxml allocates its tree in C, so compare tree sizes instead of bytes
+    full_tree = sum(1 for _ in lxml_html.fromstring(page_html).iter())
+    largest_card = [0]
+
+    def measure(card):
+        largest_card[0] = max(largest_card[0], sum(1 for _ in card.iter()))
+
+    parser = etree.HTMLParser(target=_CardTarget(measure))
+    parser.feed(page_html)
+    parser.close()
+    print(f"{'lxml elements':>14}: {full_tree} held by the full tree, at most {largest_card[0]} held by scoped parsing")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark(*sys.argv[1:2])
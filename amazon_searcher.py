@@ -1,5 +1,4 @@
 from pathlib import Path
-from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
@@ -13,10 +12,20 @@ import requests
 import os
 import zipfile
 import sys
+import queue
 import pickle
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from win32com.client import Dispatch
-from textblob import TextBlob
+from sentiment import SentimentAggregator, majority_verdict, score_reviews
+from amazon_parser import parse_product_cards
+from page_state import extract_state_products, record_source, timed_state_extract
+from review_extractor import extract_page_reviews
+from review_sampling import review_page_url, review_texts, sample_review_pages
+from review_store import sync_reviews
+from selector_stats import selector_registry
+from top_k import TopKProducts
+from verdict_engine import BUY, DONT_BUY, Verdict
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -143,29 +152,9 @@ def get_html(url, driver_path):
     finally:
         browser.quit()
 
-def extract_price(card):
-    price_selectors = [
-        'span.a-price-whole',
-        'span.a-price span[aria-hidden="true"]',
-        'span.a-price',
-        'span.a-offscreen'
-    ]
-    
-    for selector in price_selectors:
-        price_elem = card.select_one(selector)
-        if price_elem:
-            price_text = price_elem.text.strip().replace('₹', '').replace(',', '').strip('.')
-            # Extract numeric part only
-            import re
-            price_match = re.search(r'\d+(?:\.\d+)?', price_text)
-            if price_match:
-                return float(price_match.group())
-    return float('inf')  # Return infinity for items with no price
-
-def find_lowest_price_product(search_term, driver_path):
+def find_lowest_price_product(search_term, driver_path, max_products=10):
     search_term = search_term.replace(' ', '+')
     amazon_link = f"https://www.amazon.in/s?k={search_term}"
-    amazon_home = 'https://www.amazon.in'
     max_retries = 3
     retry_count = 0
     
@@ -175,64 +164,33 @@ def find_lowest_price_product(search_term, driver_path):
     while retry_count < max_retries:
         try:
             html = get_html(amazon_link, driver_path)
-            log_debug("Parsing HTML with BeautifulSoup...")
-            soup = BeautifulSoup(html, 'lxml')
+            # Embedded page state is the primary source, result-card markup the fallback
+            items = [list(product) for product in timed_state_extract(
+                extract_state_products, html, 'amazon', limit=max_products
+            )]
             
-            selectors = [
-                'div[data-component-type="s-search-result"]',
-                'div.s-result-item',
-                'div.sg-col-inner'
-            ]
+            if not items:
+                log_debug("Parsing HTML with lxml...")
+                dom_start = time.perf_counter()
+                # Stop parsing as soon as the first max_products cards are complete
+                items = parse_product_cards(html, limit=max_products, mode='stream')
+                record_source('amazon', 'dom', bool(items), time.perf_counter() - dom_start)
             
-            prod_cards = []
-            for selector in selectors:
-                prod_cards = soup.select(selector)
-                if prod_cards:
-                    log_debug(f"Found {len(prod_cards)} products using selector: {selector}")
-                    break
-            
-            if not prod_cards:
+            if not items:
                 retry_count += 1
                 log_debug(f"No products found. Retry {retry_count}/{max_retries}")
                 time.sleep(random.uniform(5, 10))
                 continue
             
-            items = []
-            for idx, card in enumerate(prod_cards[:10]):  # Look at first 10 products
-                try:
-                    title_elem = (card.select_one('h2 a.a-link-normal span') or 
-                                card.select_one('h2 span.a-text-normal') or
-                                card.select_one('h2'))
-                    
-                    if not title_elem:
-                        continue
-                        
-                    title = title_elem.text.strip()
-                    
-                    link_elem = card.select_one('h2 a') or card.select_one('a.a-link-normal')
-                    if not link_elem:
-                        continue
-                        
-                    link = link_elem.get('href', '')
-                    if not link.startswith('http'):
-                        link = amazon_home + link
-                    
-                    price = extract_price(card)
-                    
-                    if title and link and price != float('inf'):
-                        items.append([title, price, link])
-                        print(f"\nProduct {idx + 1}:")
-                        print(f"Title: {title}")
-                        print(f"Price: ₹{price}")
-                        print(f"Link: {link}")
-                        
-                        if price < lowest_price:
-                            lowest_price = price
-                            lowest_price_product = [title, price, link]
+            for idx, (title, price, link) in enumerate(items):
+                print(f"\nProduct {idx + 1}:")
+                print(f"Title: {title}")
+                print(f"Price: ₹{price}")
+                print(f"Link: {link}")
                 
-                except Exception as e:
-                    log_debug(f"Error processing product {idx + 1}: {str(e)}")
-                    continue
+                if price < lowest_price:
+                    lowest_price = price
+                    lowest_price_product = [title, price, link]
             
             if items:
                 print("\n" + "="*50)
@@ -253,23 +211,78 @@ def find_lowest_price_product(search_term, driver_path):
     
     return None
 
+def find_top_k_products(search_term, driver_path, k=10, pages=3, by='price', min_relevance=0.0):
+    """
+    Scan several Amazon result pages concurrently and keep the best k listings
+
+    Every card on every page is streamed through a bounded heap, so the
+    result is the true best k across all pages while memory stays O(k).
+
+    Args:
+        search_term: Product to search for
+        driver_path: Path to chromedriver
+        k: Number of products to return
+        pages: Number of result pages to fetch in parallel
+        by: 'price' for cheapest first, 'relevance' to prefer titles matching the search term
+        min_relevance: Drop listings whose title matches less of the search term than this
+
+    Returns:
+        List of [title, price, link], best first
+    """
+    query = search_term.replace(' ', '+')
+    top_k = TopKProducts(k, search_term=search_term, by=by, min_relevance=min_relevance)
+
+    def fetch_page(page):
+        html = get_html(f"https://www.amazon.in/s?k={query}&page={page}", driver_path)
+        items = [list(product) for product in extract_state_products(html, 'amazon')]
+        # Only card subtrees are built, so several pages in flight stay cheap
+        return items or parse_product_cards(html, limit=None, mode='scoped')
+
+    with ThreadPoolExecutor(max_workers=pages) as executor:
+        futures = {executor.submit(fetch_page, page): page for page in range(1, pages + 1)}
+        for future in as_completed(futures):
+            try:
+                items = future.result()
+            except Exception as e:
+                log_debug(f"Error fetching result page {futures[future]}: {e}")
+                continue
+            log_debug(f"Page {futures[future]}: {len(items)} products")
+            for title, price, link in items:
+                top_k.push(title, price, link)
+
+    log_debug(f"Kept {len(top_k.heap)} of {top_k.seen} listings")
+    return top_k.results()
+
 class AmazonReviewScraper:
     def __init__(self, driver_path):
         self.driver_path = driver_path
         self.driver = None
+        # Per-review score and label, and running totals, from the last analysis
+        self.scored_reviews = []
+        self.sentiment = SentimentAggregator(majority_verdict)
+        # {'reason', 'pages_scraped', 'pages_saved'} when pagination stopped early
+        self.early_stop = None
+        # {'new', 'total', 'pages', 'caught_up', 'backfill'} after an incremental sync_review_titles
+        self.sync = None
     
     def setup_driver(self):
         """Setup Chrome driver with anti-detection measures"""
         self.driver = setup_chrome_driver(self.driver_path)
         return self.driver
 
+    def load_cookies(self):
+        """Restore a saved Amazon session; False if there is none"""
+        if not os.path.exists('amazon_cookies.pkl'):
+            return False
+        self.driver.get("https://www.amazon.in")
+        cookies = pickle.load(open("amazon_cookies.pkl", "rb"))
+        for cookie in cookies:
+            self.driver.add_cookie(cookie)
+        return True
+
     def handle_login(self):
         """Handle Amazon login process"""
-        if os.path.exists('amazon_cookies.pkl'):
-            self.driver.get("https://www.amazon.in")
-            cookies = pickle.load(open("amazon_cookies.pkl", "rb"))
-            for cookie in cookies:
-                self.driver.add_cookie(cookie)
+        if self.load_cookies():
             return True
 
         self.driver.get("https://www.amazon.in")
@@ -314,16 +327,22 @@ class AmazonReviewScraper:
         time.sleep(2)
 
         try:
-            review_elements = self.driver.find_elements(By.CSS_SELECTOR, 'a[data-hook="review-title"]')
-            
-            # If the first selector doesn't work, try alternatives
-            if not review_elements:
-                review_elements = self.driver.find_elements(By.CSS_SELECTOR, 'span[data-hook="review-title"]')
-            
-            if not review_elements:
-                review_elements = self.driver.find_elements(By.CSS_SELECTOR, '.review-title')
+            records = extract_page_reviews(self.driver, 'amazon')
+            if records:
+                return [r['title'] for r in records if r['title']]
+
+            title_selectors = [
+                'a[data-hook="review-title"]',
+                'span[data-hook="review-title"]',
+                '.review-title'
+            ]
+            _, review_elements = selector_registry.first_match(
+                'amazon', 'review_title_selectors', title_selectors,
+                lambda selector: self.driver.find_elements(By.CSS_SELECTOR, selector),
+                tiers=[0, 0, 1]
+            )
 
-            for review in review_elements:
+            for review in review_elements or []:
                 title = review.text.strip()
                 if title:
                     review_titles.append(title)
@@ -345,53 +364,57 @@ class AmazonReviewScraper:
             return False
 
     def analyze_sentiment(self, reviews):
-        """Analyze sentiment and determine if the product is worth buying"""
+        """
+        Analyze sentiment and determine if the product is worth buying
+
+        The per-review scores and labels are kept in self.scored_reviews.
+        """
+        self.scored_reviews = []
+        self.sentiment = SentimentAggregator(majority_verdict)
         if not reviews:
             return "No reviews found to analyze"
-            
-        positive_count = 0
-        negative_count = 0
-        neutral_count = 0
+
+        self.stream_sentiment(reviews)
+        return self.report_sentiment()
+
+    def stream_sentiment(self, titles):
+        """Score newly extracted titles and fold them into the running sentiment"""
+        rows = score_reviews(titles)
+        start = len(self.scored_reviews)
+        self.scored_reviews.extend(rows)
+        self.sentiment.add(rows)
 
         print("\n🔹 Sentiment Analysis of Reviews:")
-        for i, review in enumerate(reviews, start=1):
-            sentiment = TextBlob(review).sentiment.polarity  # Get sentiment score
-            sentiment_str = ""
-            
-            if sentiment > 0.1:
-                positive_count += 1
-                sentiment_str = "Positive 👍"
-            elif sentiment < -0.1:
-                negative_count += 1
-                sentiment_str = "Negative 👎"
-            else:
-                neutral_count += 1
-                sentiment_str = "Neutral 😐"
-                
-            print(f"{i}. \"{review}\" - {sentiment_str} (score: {sentiment:.2f})")
+        for i, row in enumerate(rows, start=start + 1):
+            print(f"{i}. \"{row['review']}\" - {row['label']} (score: {row['score']:.2f})")
+        return rows
 
-        # Print sentiment distribution
-        total = positive_count + negative_count + neutral_count
+    def report_sentiment(self):
+        """Print the running distribution and return the verdict"""
+        positive, neutral, negative = self.sentiment.percentages()
         print(f"\n📊 Sentiment Distribution:")
-        print(f"Positive reviews: {positive_count} ({positive_count/total*100:.1f}%)")
-        print(f"Neutral reviews: {neutral_count} ({neutral_count/total*100:.1f}%)")
-        print(f"Negative reviews: {negative_count} ({negative_count/total*100:.1f}%)")
-
-        # Determine final decision (ignoring neutral reviews for decision)
-        if positive_count > negative_count:
-            confidence = positive_count / max(1, (positive_count + negative_count)) * 100
-            return f"Buy ✅ ({confidence:.1f}% positive reviews)"
-        elif negative_count > positive_count:
-            confidence = negative_count / max(1, (positive_count + negative_count)) * 100
-            return f"Don't Buy ❌ ({confidence:.1f}% negative reviews)"
-        else:
-            return "Neutral ⚖️ (Equal positive and negative sentiment)"
-
-    def scrape_review_titles(self, product_url, max_pages=2):
-        """Scrape up to max_pages review titles from Amazon and analyze sentiment"""
+        print(f"Positive reviews: {self.sentiment.positive:.0f} ({positive:.1f}%)")
+        print(f"Neutral reviews: {self.sentiment.neutral:.0f} ({neutral:.1f}%)")
+        print(f"Negative reviews: {self.sentiment.negative:.0f} ({negative:.1f}%)")
+
+        # Final decision ignores neutral reviews
+        return self.sentiment.verdict()
+
+    def scrape_review_titles(self, product_url, max_pages=2, on_page=None, early_stop=True):
+        """
+        Scrape up to max_pages review titles from Amazon and analyze sentiment
+
+        Titles are scored page by page; on_page(page, sentiment), if given, is
+        called after each page with the running SentimentAggregator. With
+        early_stop, pagination ends once the verdict is settled and the reason
+        is kept in self.early_stop.
+        """
         self.setup_driver()
         all_titles = []
         page_number = 1
+        self.scored_reviews = []
+        self.sentiment = SentimentAggregator(majority_verdict)
+        self.early_stop = None
 
         try:
             if not self.handle_login():
@@ -410,6 +433,19 @@ class AmazonReviewScraper:
                 all_titles.extend(page_titles)
                 logger.info(f"Collected {len(page_titles)} titles from page {page_number}")
 
+                self.stream_sentiment(page_titles)
+                logger.info(f"Live verdict after page {page_number}: {self.sentiment.summary()}")
+                if on_page:
+                    on_page(page_number, self.sentiment)
+
+                # More pages cannot change a settled verdict
+                reason = self.sentiment.settled() if early_stop and page_number < max_pages else None
+                if reason:
+                    self.early_stop = {'reason': reason, 'pages_scraped': page_number, 'pages_saved': max_pages - page_number}
+                    logger.info(f"Stopping early after page {page_number}/{max_pages}: {reason} "
+                                f"({max_pages - page_number} pages saved)")
+                    break
+
                 if not page_titles or not self.go_to_next_page():
                     logger.info("No more pages available")
                     break
@@ -417,8 +453,8 @@ class AmazonReviewScraper:
                 page_number += 1
                 time.sleep(2)
 
-            # Perform sentiment analysis
-            final_decision = self.analyze_sentiment(all_titles)
+            # Sentiment was aggregated page by page
+            final_decision = self.report_sentiment() if all_titles else self.sentiment.verdict()
             return all_titles, final_decision
             
         except Exception as e:
@@ -427,6 +463,111 @@ class AmazonReviewScraper:
         finally:
             if self.driver:
                 self.driver.quit()
+            selector_registry.save()
+
+    def sample_review_titles(self, product_url, page_budget=6, workers=3):
+        """
+        Stratified alternative to scrape_review_titles for products with many reviews
+
+        Fetches page_budget review pages across star filters and sort orders in
+        parallel browsers and reweights sentiment to the product's rating
+        histogram (see review_sampling). Falls back to scrape_review_titles if
+        sampling is not possible for the link.
+        """
+        # Browsers are lent out to fetches one at a time; this scraper's own
+        # browser is the first, more are started only while it is busy and
+        # reuse the session it logged in with
+        idle_drivers = queue.Queue()
+        extra_drivers = []
+
+        def fetch(url):
+            try:
+                driver = idle_drivers.get_nowait()
+            except queue.Empty:
+                browser = AmazonReviewScraper(self.driver_path)
+                driver = browser.setup_driver()
+                extra_drivers.append(driver)
+                browser.load_cookies()
+            try:
+                driver.get(url)
+                time.sleep(3)
+                return driver.page_source
+            finally:
+                idle_drivers.put(driver)
+
+        self.early_stop = None
+        if not review_page_url('amazon', product_url):
+            return self.scrape_review_titles(product_url, max_pages=page_budget)
+
+        # Log in once, on this thread, before any worker needs the session
+        self.setup_driver()
+        try:
+            if not self.handle_login():
+                logger.error("Login failed")
+                return [], "Login failed, could not analyze reviews"
+            idle_drivers.put(self.driver)
+            sample = sample_review_pages('amazon', product_url, fetch, page_budget, workers, majority_verdict)
+        except Exception as e:
+            logger.error(f"Error during review sampling: {e}")
+            sample = None
+        finally:
+            for driver in extra_drivers + [self.driver]:
+                driver.quit()
+            self.driver = None
+        if sample is None:
+            return self.scrape_review_titles(product_url, max_pages=page_budget)
+
+        self.scored_reviews = sample['scored']
+        self.sentiment = sample['sentiment']
+        titles = review_texts('amazon', sample['records'])
+        final_decision = self.report_sentiment() if titles else self.sentiment.verdict()
+        selector_registry.save()
+        return titles, final_decision
+
+    def sync_review_titles(self, product_url, max_pages=5, on_page=None):
+        """
+        Incremental alternative to scrape_review_titles for products analyzed before
+
+        Fetches newest-first review pages only until a review seen on an
+        earlier sync turns up, then resumes any unfinished backfill of older
+        pages, and merges the new ones into the stored corpus and sentiment
+        (see review_store). Counts are kept in self.sync. Falls
+        back to scrape_review_titles if no review URL can be built for the link.
+        """
+        def fetch(url):
+            self.driver.get(url)
+            time.sleep(3)
+            return self.driver.page_source
+
+        self.early_stop = None
+        self.sync = None
+        if not review_page_url('amazon', product_url):
+            return self.scrape_review_titles(product_url, max_pages=max_pages, on_page=on_page)
+
+        self.setup_driver()
+        try:
+            if not self.handle_login():
+                logger.error("Login failed")
+                return [], "Login failed, could not analyze reviews"
+            result = sync_reviews('amazon', product_url, fetch, max_pages, majority_verdict, on_page)
+
+            self.scored_reviews = result['scored']
+            self.sentiment = result['sentiment']
+            self.early_stop = result['early_stop']
+            self.sync = {'new': len(result['new']), 'total': len(result['records']),
+                         'pages': result['pages'], 'caught_up': result['caught_up'], 'backfill': result['backfill']}
+            titles = [record['title'] for record in result['records'] if record['title']]
+            final_decision = self.report_sentiment() if titles else self.sentiment.verdict()
+            return titles, final_decision
+
+        except Exception as e:
+            logger.error(f"Error during review sync: {e}")
+            return [], f"Error occurred: {str(e)}"
+        finally:
+            if self.driver:
+                self.driver.quit()
+            selector_registry.save()
+
 
 def main():
     # Setup chrome driver path
@@ -462,12 +603,13 @@ def main():
     else:
         print("No review titles were extracted.")
     
-    print("\n🔍 Final Verdict:", decision)
+    verdict = scraper.sentiment.judgement() if review_titles else Verdict.unavailable(decision)
+    print("\n🔍 Final Verdict:", verdict)
     
     print("\n💡 Should you buy the product?")
-    if "Buy ✅" in decision:
+    if verdict.action == BUY:
         print("Recommendation: YES - This product appears to have overall positive reviews and is the lowest priced option.")
-    elif "Don't Buy ❌" in decision:
+    elif verdict.action == DONT_BUY:
         print("Recommendation: NO - Although this is the lowest priced option, reviews suggest poor quality or satisfaction.")
     else:
         print("Recommendation: MAYBE - Reviews are mixed. Consider your specific needs carefully.")
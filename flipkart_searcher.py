@@ -8,8 +8,20 @@ from selenium.webdriver.support import expected_conditions as EC
 import time
 import logging
 import os
+import queue
 import sys
-from textblob import TextBlob  # For sentiment analysis
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sentiment import SentimentAggregator, score_reviews, threshold_verdict
+from price_utils import format_price, normalize_prices
+from page_state import extract_state_products, record_source, timed_state_extract
+from review_extractor import extract_page_data, extract_page_reviews
+from review_dedupe import NearDuplicateFilter
+from review_text import normalize_review
+from review_sampling import sample_review_pages
+from review_store import sync_reviews
+from top_k import TopKProducts
+from product_identity import product_key
+from selector_stats import selector_registry
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -31,11 +43,13 @@ class FlipkartProductSearch:
         browser = webdriver.Chrome(service=service, options=chrome_options)
         return browser
     
-    def search_products(self, search_term):
+    def search_products(self, search_term, page=1, max_products=5):
         """Search for products on Flipkart using the search term"""
         print(f"\n🔎 Searching for '{search_term}' on Flipkart...\n")
         search_term = search_term.replace(' ', '+')
         flipkart_link = f"https://www.flipkart.com/search?q={search_term}"
+        if page > 1:
+            flipkart_link += f"&page={page}"
         browser = self.create_browser()
         
         try:
@@ -43,6 +57,23 @@ class FlipkartProductSearch:
             browser.get(flipkart_link)
             time.sleep(10)  # Extended wait time
             
+            # Embedded page state is the primary source, DOM selectors the fallback
+            state_products = timed_state_extract(
+                extract_state_products, browser.page_source, 'flipkart', limit=max_products
+            )
+            if state_products:
+                print(f"Found {len(state_products)} products in embedded page state")
+                for title, price, link in state_products:
+                    self.products.append({
+                        'title': title,
+                        'price': price,
+                        'price_text': format_price(price),
+                        'link': link
+                    })
+                return self.products
+            
+            dom_start = time.perf_counter()
+            
             # Try multiple strategies to find product elements
             product_strategies = [
                 (By.CSS_SELECTOR, 'div[data-id]'),
@@ -51,27 +82,25 @@ class FlipkartProductSearch:
                 (By.XPATH, '//a[contains(@href, "/p/")]/../..')
             ]
             
-            products_found = False
-            product_containers = []
-            
-            for strategy in product_strategies:
-                try:
-                    product_containers = browser.find_elements(*strategy)
-                    if product_containers:
-                        products_found = True
-                        print(f"Found {len(product_containers)} products using {strategy}")
-                        break
-                except Exception as e:
-                    print(f"Strategy {strategy} failed: {e}")
+            strategy, product_containers = selector_registry.first_match(
+                'flipkart', 'product_strategies', product_strategies,
+                lambda strategy: browser.find_elements(*strategy),
+                tiers=[0, 0, 1, 2]
+            )
+            products_found = bool(product_containers)
+            if products_found:
+                print(f"Found {len(product_containers)} products using {strategy}")
             
             if not products_found:
+                record_source('flipkart', 'dom', False, time.perf_counter() - dom_start)
                 print("No products found. Saving page source for debugging.")
                 with open('debug_page_source.html', 'w', encoding='utf-8') as f:
                     f.write(browser.page_source)
                 return []
             
-            # Process the first 5 products
-            for idx, container in enumerate(product_containers[:5], 1):
+            # Collect raw fields for the first products, then normalize all prices at once
+            candidates = []
+            for idx, container in enumerate(product_containers[:max_products], 1):
                 try:
                     # More comprehensive title extraction
                     title_selectors = [
@@ -82,24 +111,24 @@ class FlipkartProductSearch:
                         './/div[contains(@class, "product-title")]'
                     ]
                     
-                    title = "Title Not Available"
-                    for selector in title_selectors:
-                        try:
-                            title_elem = container.find_element(By.XPATH, selector)
-                            candidate_title = title_elem.text.strip()
-                            if candidate_title and candidate_title != "Add to Compare":
-                                title = candidate_title
-                                break
-                        except:
-                            continue
+                    def probe_title(selector):
+                        candidate_title = container.find_element(By.XPATH, selector).text.strip()
+                        return candidate_title if candidate_title != "Add to Compare" else None
+                    
+                    # Layout-specific classes first; the bare product link
+                    # would return the whole card's text
+                    _, title = selector_registry.first_match(
+                        'flipkart', 'title_selectors', title_selectors, probe_title,
+                        tiers=[0, 0, 0, 1, 2]
+                    )
+                    title = title or "Title Not Available"
                     
-                    # Price extraction with multiple attempts
+                    # Raw price text; parsed in one batch below
                     try:
                         price_elem = container.find_element(By.XPATH, './/div[contains(@class, "_30jeq3") or contains(text(), "₹")]')
-                        price_text = price_elem.text.replace('₹','').replace(',','')
-                        price = float(price_text) if price_text.replace('.', '', 1).isdigit() else float('inf')
+                        raw_price = price_elem.text
                     except:
-                        price = float('inf')
+                        raw_price = ''
                     
                     # Link extraction
                     try:
@@ -108,22 +137,31 @@ class FlipkartProductSearch:
                     except:
                         link = None
                     
-                    # Add to products list if we have valid data
-                    if title != "Title Not Available" and price != float('inf') and link:
-                        self.products.append({
-                            'title': title,
-                            'price': price,
-                            'price_text': f"₹{price:,.2f}",
-                            'link': link
-                        })
-                        print(f"\nProduct {idx}:")
-                        print(f"Title: {title}")
-                        print(f"Price: ₹{price:,.2f}")
-                        print(f"Link: {link}")
+                    if title != "Title Not Available" and link:
+                        candidates.append((idx, title, raw_price, link))
                 
                 except Exception as e:
                     print(f"Error processing product {idx}: {e}")
             
+            prices = normalize_prices([raw_price for _, _, raw_price, _ in candidates])
+            seen_keys = set()
+            for (idx, title, _, link), price in zip(candidates, prices):
+                # Add to products list if we have valid data, once per product
+                key = product_key(link)
+                if price != float('inf') and key not in seen_keys:
+                    seen_keys.add(key)
+                    self.products.append({
+                        'title': title,
+                        'price': price,
+                        'price_text': format_price(price),
+                        'link': link
+                    })
+                    print(f"\nProduct {idx}:")
+                    print(f"Title: {title}")
+                    print(f"Price: {format_price(price)}")
+                    print(f"Link: {link}")
+            
+            record_source('flipkart', 'dom', bool(self.products), time.perf_counter() - dom_start)
             return self.products
             
         except Exception as e:
@@ -134,6 +172,39 @@ class FlipkartProductSearch:
         
         finally:
             browser.quit()
+            selector_registry.save()
+    
+    def search_top_k(self, search_term, k=5, pages=3, by='price', min_relevance=0.0):
+        """
+        Search several result pages concurrently and keep the best k products
+
+        Each page is searched in its own browser and every listing on it is
+        streamed through a bounded heap, so memory stays O(k).
+        """
+        top_k = TopKProducts(k, search_term=search_term, by=by, min_relevance=min_relevance)
+
+        def search_page(page):
+            return FlipkartProductSearch(self.driver_path).search_products(
+                search_term, page=page, max_products=None
+            )
+
+        with ThreadPoolExecutor(max_workers=pages) as executor:
+            futures = {executor.submit(search_page, page): page for page in range(1, pages + 1)}
+            for future in as_completed(futures):
+                try:
+                    page_products = future.result()
+                except Exception as e:
+                    logger.error(f"Error searching result page {futures[future]}: {e}")
+                    continue
+                for product in page_products:
+                    top_k.push(product['title'], product['price'], product['link'])
+
+        logger.info(f"Kept {len(top_k.heap)} of {top_k.seen} listings")
+        self.products = [
+            {'title': title, 'price': price, 'price_text': format_price(price), 'link': link}
+            for title, price, link in top_k.results()
+        ]
+        return self.products
     
     def get_lowest_price_product(self):
         """Returns the product with the lowest price"""
@@ -148,6 +219,14 @@ class FlipkartProductSearch:
 class FlipkartReviewScraper:
     def __init__(self, driver_path="chromedriver.exe"):
         self.driver_path = driver_path
+        self.review_records = []
+        # Per-review score and label, and running totals, from the last analysis
+        self.scored_reviews = []
+        self.sentiment = SentimentAggregator(threshold_verdict)
+        # {'reason', 'pages_scraped', 'pages_saved'} when pagination stopped early
+        self.early_stop = None
+        # {'new', 'total', 'pages', 'caught_up', 'backfill'} after an incremental sync_reviews
+        self.sync = None
         self.setup_driver()
         
     def setup_driver(self):
@@ -242,21 +321,25 @@ class FlipkartReviewScraper:
             "//button[contains(text(), 'All reviews')]"
         ]
         
-        for selector in review_selectors:
-            try:
-                review_elements = self.driver.find_elements(By.XPATH, selector)
-                for element in review_elements:
-                    try:
-                        if element.is_displayed():
-                            logger.info(f"Found reviews section: {element.text}")
-                            element.click()
-                            logger.info("Clicked on reviews section")
-                            time.sleep(3)
-                            return True
-                    except:
-                        continue
-            except:
-                continue
+        def click_review_section(selector):
+            for element in self.driver.find_elements(By.XPATH, selector):
+                try:
+                    if element.is_displayed():
+                        logger.info(f"Found reviews section: {element.text}")
+                        element.click()
+                        logger.info("Clicked on reviews section")
+                        time.sleep(3)
+                        return True
+                except:
+                    continue
+            return False
+        
+        selector, _ = selector_registry.first_match(
+            'flipkart', 'review_selectors', review_selectors, click_review_section,
+            tiers=[0, 0, 0, 1, 1, 1, 1]
+        )
+        if selector:
+            return True
         
         # If we can't find a review section, try to find a direct "All Reviews" link
         try:
@@ -286,14 +369,24 @@ class FlipkartReviewScraper:
         logger.warning("Could not navigate to reviews section. Will try to extract reviews from current page.")
         return False
     
-    def extract_review_titles(self):
-        """Extract review titles from the current page"""
+    def extract_review_titles(self, bulk=True):
+        """
+        Extract review titles from the current page
+
+        bulk=False skips the one-call extraction, for callers that already
+        ran it on this page through extract_page.
+        """
         review_titles = []
         
         # Scroll to load all content
         self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight/2);")
         time.sleep(2)
         
+        # Read every review node in one browser round-trip when possible
+        records = extract_page_reviews(self.driver, 'flipkart') if bulk else []
+        if records:
+            return [r['title'] for r in records if r['title'] and len(r['title']) > 3]
+        
         # Try different selectors for review titles
         title_selectors = [
             "//p[@class='_2-N8zT']",
@@ -303,23 +396,22 @@ class FlipkartReviewScraper:
             "//div[contains(@class, 't-ZTKy')]/div[1]"
         ]
         
-        for selector in title_selectors:
-            try:
-                title_elements = self.driver.find_elements(By.XPATH, selector)
-                if title_elements:
-                    logger.info(f"Found {len(title_elements)} review titles using selector: {selector}")
-                    for title_element in title_elements:
-                        title = title_element.text.strip()
-                        if title and len(title) > 3:  # Ensure it's a meaningful title
-                            review_titles.append(title)
-                    break
-            except Exception as e:
-                logger.debug(f"Error with selector {selector}: {e}")
+        selector, title_elements = selector_registry.first_match(
+            'flipkart', 'review_title_selectors', title_selectors,
+            lambda selector: self.driver.find_elements(By.XPATH, selector),
+            tiers=[0, 0, 0, 0, 1]
+        )
+        if title_elements:
+            logger.info(f"Found {len(title_elements)} review titles using selector: {selector}")
+            for title_element in title_elements:
+                title = title_element.text.strip()
+                if title and len(title) > 3:  # Ensure it's a meaningful title
+                    review_titles.append(title)
         
         return review_titles
     
-    def extract_reviews(self):
-        """Extract full reviews from the current page"""
+    def extract_reviews(self, bulk=True):
+        """Extract full reviews from the current page; bulk as in extract_review_titles"""
         reviews = []
         
         # Scroll to ensure all reviews are loaded
@@ -330,6 +422,11 @@ class FlipkartReviewScraper:
         self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
         time.sleep(2)
         
+        records = extract_page_reviews(self.driver, 'flipkart') if bulk else []
+        reviews = [r['body'] for r in records if r['body'] and len(r['body']) > 10]
+        if reviews:
+            return reviews
+        
         # Try different review selectors
         review_selectors = [
             "//div[@class='t-ZTKy']",
@@ -338,16 +435,15 @@ class FlipkartReviewScraper:
             "//div[contains(@class, '_6K-7Co')]"
         ]
         
-        review_elements = []
-        for selector in review_selectors:
-            try:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                if elements:
-                    logger.info(f"Found {len(elements)} reviews using selector: {selector}")
-                    review_elements = elements
-                    break
-            except Exception as e:
-                logger.debug(f"Error with selector {selector}: {e}")
+        selector, review_elements = selector_registry.first_match(
+            'flipkart', 'review_body_selectors', review_selectors,
+            lambda selector: self.driver.find_elements(By.XPATH, selector),
+            tiers=[0, 0, 0, 0]
+        )
+        if review_elements:
+            logger.info(f"Found {len(review_elements)} reviews using selector: {selector}")
+        else:
+            review_elements = []
         
         # Extract text from the found elements
         for element in review_elements:
@@ -409,9 +505,8 @@ class FlipkartReviewScraper:
                 "//a[contains(@class, '_1LKTO3') and contains(text(), 'Next')]"
             ]
             
-            for selector in next_button_selectors:
-                next_buttons = self.driver.find_elements(By.XPATH, selector)
-                for button in next_buttons:
+            def click_next(selector):
+                for button in self.driver.find_elements(By.XPATH, selector):
                     try:
                         if button.is_displayed() and "Next" in button.text:
                             logger.info(f"Found Next button: {button.text}")
@@ -421,6 +516,14 @@ class FlipkartReviewScraper:
                             return True
                     except:
                         continue
+                return False
+            
+            selector, _ = selector_registry.first_match(
+                'flipkart', 'next_button_selectors', next_button_selectors, click_next,
+                tiers=[0, 0, 0, 0]
+            )
+            if selector:
+                return True
             
             logger.info("No Next button found or couldn't click it")
             return False
@@ -430,38 +533,37 @@ class FlipkartReviewScraper:
             return False
     
     def analyze_sentiment(self, reviews):
-        """Analyze sentiment and determine if the product is worth buying"""
+        """
+        Analyze sentiment and determine if the product is worth buying
+        
+        The per-review scores and labels are kept in self.scored_reviews.
+        """
+        self.scored_reviews = []
+        self.sentiment = SentimentAggregator(threshold_verdict)
         if not reviews:
             return "No reviews available for analysis"
-            
-        positive_count = 0
-        negative_count = 0
-        neutral_count = 0
         
         logger.info("Performing sentiment analysis...")
-        for review in reviews:
-            sentiment = TextBlob(review).sentiment.polarity
-            if sentiment > 0.1:
-                positive_count += 1
-            elif sentiment < -0.1:
-                negative_count += 1
-            else:
-                neutral_count += 1
-        
-        total_reviews = len(reviews)
-        positive_percentage = (positive_count / total_reviews * 100) if total_reviews > 0 else 0
-        negative_percentage = (negative_count / total_reviews * 100) if total_reviews > 0 else 0
-        neutral_percentage = (neutral_count / total_reviews * 100) if total_reviews > 0 else 0
-        
+        self.stream_sentiment(reviews)
+        return self.report_sentiment()
+    
+    def stream_sentiment(self, texts, reviews=None):
+        """
+        Score newly extracted texts and fold them into the running sentiment
+
+        reviews is how many reviews the texts come from, when a review can
+        contribute both its title and body (see SentimentAggregator.add).
+        """
+        rows = score_reviews(texts)
+        self.scored_reviews.extend(rows)
+        self.sentiment.add(rows, reviews)
+        return rows
+    
+    def report_sentiment(self):
+        """Log the running distribution and return the verdict"""
+        positive_percentage, neutral_percentage, negative_percentage = self.sentiment.percentages()
         logger.info(f"Sentiment analysis results: Positive: {positive_percentage:.1f}%, Negative: {negative_percentage:.1f}%, Neutral: {neutral_percentage:.1f}%")
-        
-        # Determine final decision
-        if positive_percentage >= 60:
-            return f"Buy ✅ ({positive_count}/{total_reviews} or {positive_percentage:.1f}% reviews are positive)"
-        elif negative_percentage >= 40:
-            return f"Don't Buy ❌ ({negative_count}/{total_reviews} or {negative_percentage:.1f}% reviews are negative)"
-        else:
-            return f"Consider with Caution ⚠️ (Mixed reviews - {positive_percentage:.1f}% positive, {negative_percentage:.1f}% negative, {neutral_percentage:.1f}% neutral)"
+        return self.sentiment.verdict()
     
     def extract_product_info(self):
         """Extract basic product information like name and price"""
@@ -476,14 +578,14 @@ class FlipkartReviewScraper:
                 "//h1[contains(@class, 'yhB1nd')]"
             ]
             
-            for selector in name_selectors:
-                try:
-                    name_element = self.driver.find_element(By.XPATH, selector)
-                    product_info['name'] = name_element.text.strip()
-                    logger.info(f"Found product name: {product_info['name']}")
-                    break
-                except:
-                    continue
+            _, name = selector_registry.first_match(
+                'flipkart', 'name_selectors', name_selectors,
+                lambda selector: self.driver.find_element(By.XPATH, selector).text.strip(),
+                tiers=[0, 0, 0, 0]
+            )
+            if name:
+                product_info['name'] = name
+                logger.info(f"Found product name: {product_info['name']}")
             
             # Try to extract product price
             price_selectors = [
@@ -492,30 +594,63 @@ class FlipkartReviewScraper:
                 "//div[contains(@class, 'price')]"
             ]
             
-            for selector in price_selectors:
-                try:
-                    price_element = self.driver.find_element(By.XPATH, selector)
-                    product_info['price'] = price_element.text.strip()
-                    logger.info(f"Found product price: {product_info['price']}")
-                    break
-                except:
-                    continue
+            _, price = selector_registry.first_match(
+                'flipkart', 'price_selectors', price_selectors,
+                lambda selector: self.driver.find_element(By.XPATH, selector).text.strip(),
+                tiers=[0, 0, 1]
+            )
+            if price:
+                product_info['price'] = price
+                logger.info(f"Found product price: {product_info['price']}")
                     
         except Exception as e:
             logger.error(f"Error extracting product info: {e}")
         
         return product_info
     
-    def scrape_reviews(self, product_url, pages_to_scrape=3):
+    def extract_page(self):
+        """
+        Extract titles, bodies, ratings and product info from the current page
+        with one scroll, one wait and one extraction script call
+        """
+        self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        time.sleep(2)
+        
+        page_data = extract_page_data(self.driver, 'flipkart')
+        records = page_data['reviews']
+        logger.info(f"Page contained {len(records)} reviews")
+        
+        return {
+            'titles': [r['title'] for r in records if r['title'] and len(r['title']) > 3],
+            'reviews': [r['body'] for r in records if r['body'] and len(r['body']) > 10],
+            'ratings': [r['rating'] for r in records if r['rating'] is not None],
+            'records': records,
+            'product_info': page_data['product'],
+        }
+    
+    def scrape_reviews(self, product_url, pages_to_scrape=3, on_page=None, early_stop=True):
         """
         Extract reviews from a Flipkart product page and perform sentiment analysis
         
+        Sentiment is scored page by page as reviews come in.
+        
         Args:
             product_url: URL of the Flipkart product page
             pages_to_scrape: Number of review pages to scrape
+            on_page: Optional callback(page, sentiment) run after each page with
+                the running SentimentAggregator, e.g. to show a live verdict
+            early_stop: Stop paginating once the verdict is settled (see
+                SentimentAggregator.settled); the reason is kept in self.early_stop
         """
         all_reviews = []
         all_titles = []
+        self.review_records = []
+        self.scored_reviews = []
+        self.sentiment = SentimentAggregator(threshold_verdict)
+        self.early_stop = None
+        # Repeated and near-identical texts (READ MORE, rating prefixes) are
+        # dropped as they arrive, keeping page order
+        review_filter, title_filter = NearDuplicateFilter(), NearDuplicateFilter()
         
         try:
             # Handle login (close popup)
@@ -528,8 +663,8 @@ class FlipkartReviewScraper:
                 logger.error("Failed to navigate to the product page")
                 return [], [], "Error: Failed to load product page", {}
             
-            # Extract product info first
-            product_info = self.extract_product_info()
+            # Product info comes from the first page's extraction
+            product_info = {}
             
             # Navigate to reviews page
             self.navigate_to_reviews()
@@ -538,14 +673,27 @@ class FlipkartReviewScraper:
             for page in range(1, pages_to_scrape + 1):
                 logger.info(f"\n--- Processing Page {page}/{pages_to_scrape} ---")
                 
-                # First extract titles which are usually more reliable
-                page_titles = self.extract_review_titles()
+                # One script call gives titles, reviews, ratings and product info
+                page_data = self.extract_page()
+                page_titles = page_data['titles']
+                page_reviews = page_data['reviews']
+                self.review_records.extend(page_data['records'])
+                if not product_info:
+                    product_info = page_data['product_info']
+                
+                # Fall back to the probing extractors if the extraction found nothing;
+                # their bulk pass would only repeat it
+                if not page_titles and not page_reviews:
+                    page_titles = self.extract_review_titles(bulk=False)
+                    page_reviews = self.extract_reviews(bulk=False)
+                
+                page_titles = title_filter.unique(page_titles)
+                page_reviews = review_filter.unique(page_reviews)
+                
                 if page_titles:
                     all_titles.extend(page_titles)
                     logger.info(f"Extracted {len(page_titles)} review titles from page {page}")
                 
-                # Then extract full reviews
-                page_reviews = self.extract_reviews()
                 if page_reviews:
                     all_reviews.extend(page_reviews)
                     logger.info(f"Extracted {len(page_reviews)} full reviews from page {page}")
@@ -554,15 +702,28 @@ class FlipkartReviewScraper:
                 if not page_reviews and not page_titles:
                     logger.warning(f"No content found on page {page}")
                 
+                # A review's title and body are one observation for the early stop
+                self.stream_sentiment(page_reviews + page_titles, max(len(page_reviews), len(page_titles)))
+                logger.info(f"Live verdict after page {page}: {self.sentiment.summary()}")
+                if on_page:
+                    on_page(page, self.sentiment)
+                
+                # More pages cannot change a settled verdict
+                reason = self.sentiment.settled() if early_stop and page < pages_to_scrape else None
+                if reason:
+                    self.early_stop = {'reason': reason, 'pages_scraped': page, 'pages_saved': pages_to_scrape - page}
+                    logger.info(f"Stopping early after page {page}/{pages_to_scrape}: {reason} "
+                                f"({pages_to_scrape - page} pages saved)")
+                    break
+                
                 # Go to next page if available
                 if page < pages_to_scrape:
                     if not self.go_to_next_page():
                         logger.info("No more pages available. Stopping.")
                         break
             
-            # Remove duplicates
-            all_reviews = list(set(all_reviews))
-            all_titles = list(set(all_titles))
+            if review_filter.dropped or title_filter.dropped:
+                logger.info(f"Dropped {review_filter.dropped} duplicate reviews and {title_filter.dropped} duplicate titles")
             
             # If we haven't got any reviews, try one more approach - if the URL is not a review URL,
             # try to convert it to a reviews URL directly
@@ -579,21 +740,28 @@ class FlipkartReviewScraper:
                         time.sleep(3)
                         
                         # Try again to extract reviews from this page
-                        direct_titles = self.extract_review_titles()
-                        direct_reviews = self.extract_reviews()
+                        page_data = self.extract_page()
+                        direct_titles = title_filter.unique(page_data['titles'] or self.extract_review_titles(bulk=False))
+                        direct_reviews = review_filter.unique(page_data['reviews'] or self.extract_reviews(bulk=False))
+                        self.review_records.extend(page_data['records'])
                         
                         if direct_titles:
                             all_titles.extend(direct_titles)
                         if direct_reviews:
                             all_reviews.extend(direct_reviews)
+                        self.stream_sentiment(direct_reviews + direct_titles,
+                                              max(len(direct_reviews), len(direct_titles)))
+                        if on_page:
+                            on_page(1, self.sentiment)
                 except Exception as e:
                     logger.error(f"Error with direct review URL approach: {e}")
             
-            # Sentiment analysis based on combined reviews and titles
-            all_content = all_reviews + all_titles
+            if not product_info:
+                product_info = self.extract_product_info()
             
-            if all_content:
-                decision = self.analyze_sentiment(all_content)
+            # Sentiment was aggregated over combined reviews and titles while scraping
+            if self.sentiment.total:
+                decision = self.report_sentiment()
             else:
                 decision = "Could not find any reviews to analyze"
             
@@ -611,8 +779,111 @@ class FlipkartReviewScraper:
         finally:
             # Clean up resources
             self.driver.quit()
+            selector_registry.save()
             logger.info("Browser closed successfully")
 
+    def sample_reviews(self, product_url, page_budget=6, workers=3):
+        """
+        Stratified alternative to scrape_reviews for products with many reviews
+
+        Fetches page_budget review pages across sort orders in parallel
+        browsers and reweights sentiment to the product's rating histogram
+        (see review_sampling). Falls back to scrape_reviews if sampling is not
+        possible for the link. Returns the same tuple as scrape_reviews.
+        """
+        # Browsers are lent out to fetches one at a time; this scraper's own
+        # browser is the first, more are started only while it is busy
+        idle_drivers = queue.Queue()
+        idle_drivers.put(self.driver)
+        extra_drivers = []
+
+        def fetch(url):
+            try:
+                driver = idle_drivers.get_nowait()
+            except queue.Empty:
+                driver = FlipkartReviewScraper(self.driver_path).driver
+                extra_drivers.append(driver)
+            try:
+                driver.get(url)
+                time.sleep(3)
+                return driver.page_source
+            finally:
+                idle_drivers.put(driver)
+
+        self.early_stop = None
+        try:
+            sample = sample_review_pages('flipkart', product_url, fetch, page_budget, workers, threshold_verdict)
+        except Exception as e:
+            logger.error(f"An error occurred during review sampling: {e}")
+            sample = None
+        finally:
+            for driver in extra_drivers:
+                driver.quit()
+        if sample is None:
+            # scrape_reviews closes this scraper's browser itself
+            return self.scrape_reviews(product_url, pages_to_scrape=page_budget)
+
+        try:
+            self.review_records = sample['records']
+            self.scored_reviews = sample['scored']
+            self.sentiment = sample['sentiment']
+            # The same texts scrape_reviews keeps, and the ones sampling scored
+            all_reviews = [record['body'] for record in sample['records'] if record['body'] and len(record['body']) > 10]
+            all_titles = [record['title'] for record in sample['records'] if record['title'] and len(record['title']) > 3]
+            decision = self.report_sentiment() if self.sentiment.total else "Could not find any reviews to analyze"
+            logger.info(f"Sampled {len(sample['plan']) + 1} review pages, final decision: {decision}")
+            return all_reviews, all_titles, decision, sample['product']
+
+        finally:
+            self.driver.quit()
+            selector_registry.save()
+
+    def sync_reviews(self, product_url, max_pages=5, on_page=None):
+        """
+        Incremental alternative to scrape_reviews for products analyzed before
+
+        Fetches newest-first review pages only until a review seen on an
+        earlier sync turns up, then resumes any unfinished backfill of older
+        pages, and merges the new ones into the stored corpus and sentiment
+        (see review_store). Counts are kept in self.sync. Falls
+        back to scrape_reviews if no review URL can be built for the link.
+        Returns the same tuple as scrape_reviews, over every stored review.
+        """
+        def fetch(url):
+            self.driver.get(url)
+            time.sleep(3)
+            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            time.sleep(2)
+            return self.driver.page_source
+
+        self.early_stop = None
+        self.sync = None
+        try:
+            result = sync_reviews('flipkart', product_url, fetch, max_pages, threshold_verdict, on_page)
+        except Exception as e:
+            logger.error(f"An error occurred during review sync: {e}")
+            self.driver.quit()
+            return [], [], f"Error: {e}", {}
+        if result is None:
+            # scrape_reviews closes this scraper's browser itself
+            return self.scrape_reviews(product_url, pages_to_scrape=max_pages, on_page=on_page)
+
+        try:
+            self.review_records = result['records']
+            self.scored_reviews = result['scored']
+            self.sentiment = result['sentiment']
+            self.early_stop = result['early_stop']
+            self.sync = {'new': len(result['new']), 'total': len(result['records']),
+                         'pages': result['pages'], 'caught_up': result['caught_up'], 'backfill': result['backfill']}
+            all_reviews = [record['body'] for record in result['records'] if record['body'] and len(record['body']) > 10]
+            all_titles = [record['title'] for record in result['records'] if record['title'] and len(record['title']) > 3]
+            decision = self.report_sentiment() if self.sentiment.total else "Could not find any reviews to analyze"
+            return all_reviews, all_titles, decision, result['product']
+
+        finally:
+            self.driver.quit()
+            selector_registry.save()
+
 
 def main():
     print("\n🛍️ Flipkart Product Search & Review Analyzer 🔍")
@@ -708,10 +979,7 @@ def main():
         print(f"\n📝 Sample Full Reviews:")
         for i, review in enumerate(all_reviews[:3], start=1):
             # Truncate long reviews for display
-            if len(review) > 100:
-                print(f"{i}. {review[:100]}...")
-            else:
-                print(f"{i}. {review}")
+            print(f"{i}. {normalize_review(review).preview(100)}")
         if len(all_reviews) > 3:
             print(f"... and {len(all_reviews) - 3} more reviews")
     
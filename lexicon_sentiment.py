@@ -0,0 +1,203 @@
+import sys
+import threading
+import time
+from array import array
+import numpy as np
+from review_text import current, normalize_review, token_table
+
+# Bump when the scoring rules change so cached scores are not reused
+LEXICON_VERSION = 'lexicon-2'
+
+# "good!" scores 25% stronger, as in TextBlob
+EXCLAMATION_BOOST = 1.25
+# "not good" is slightly bad, "not bad" slightly good
+NEGATION_FACTOR = -0.5
+
+
+class LexiconScorer:
+    """
+    Batch polarity/subjectivity scorer built on TextBlob's adjective lexicon
+
+    The token ids of a batch of NormalizedReviews are concatenated into flat
+    (review, term) arrays, in effect a sparse review-by-term matrix. Lexicon scores, modifier
+    intensities ("very good"), negations ("not good") and exclamation marks
+    are then applied with NumPy over all tokens at once, and per-review means
+    come from np.bincount. Emoticons and the longer-range negation/modifier
+    carry-over TextBlob does ("really not good") are not modelled.
+    """
+
+    def __init__(self, lexicon=None):
+        if lexicon is None:
+            from sentiment_service import sentiment_service
+            lexicon = sentiment_service.lexicon
+
+        # Row 0 is reserved for tokens that are not in the lexicon
+        self.vocabulary = {word: row for row, word in enumerate(lexicon, start=1)}
+        size = len(self.vocabulary) + 1
+        self.polarity = np.zeros(size)
+        self.subjectivity = np.zeros(size)
+        self.intensity = np.ones(size)
+        self.modifier = np.zeros(size, dtype=bool)
+        for word, row in self.vocabulary.items():
+            senses = lexicon[word]
+            self.polarity[row], self.subjectivity[row], self.intensity[row] = senses[None]
+            self.modifier[row] = any(pos in senses for pos in lexicon.modifiers)
+        self.known = np.arange(size) > 0
+
+        # Negations are not in the lexicon, so they get ids past its end
+        self.negations = {word: size + i for i, word in enumerate(lexicon.negations)}
+        self.exclamation = size + len(self.negations)
+
+        # Scorer id and length of every token_table entry, extended as it grows
+        # and rebuilt when the table is reset
+        self._token_rows = np.zeros(0, dtype=np.int64)
+        self._token_lengths = np.zeros(0, dtype=np.int64)
+        self._generation = token_table.generation
+        self._rows_lock = threading.Lock()
+
+    def _token_lookup(self):
+        with self._rows_lock:
+            generation = token_table.generation
+            if generation != self._generation:
+                self._token_rows = np.zeros(0, dtype=np.int64)
+                self._token_lengths = np.zeros(0, dtype=np.int64)
+                self._generation = generation
+            seen = len(self._token_rows)
+            if seen < len(token_table):
+                new_tokens = token_table.tokens[seen:]
+                lookup = self.vocabulary.get
+                rows = [self.negations.get(token) or (self.exclamation if token == '!' else lookup(token, 0))
+                        for token in new_tokens]
+                self._token_rows = np.concatenate([self._token_rows, np.array(rows, dtype=np.int64)])
+                self._token_lengths = np.concatenate(
+                    [self._token_lengths, np.array([len(token) for token in new_tokens], dtype=np.int64)]
+                )
+            return self._token_rows, self._token_lengths, generation
+
+    def score_records(self, reviews):
+        """(polarity, subjectivity) per NormalizedReview, in input order"""
+        reviews = list(reviews)
+        if not reviews:
+            return []
+
+        # Rows and ids must come from the same token_table generation
+        while True:
+            reviews = [current(review) for review in reviews]
+            token_rows, token_lengths, generation = self._token_lookup()
+            if generation == token_table.generation and all(review.generation == generation for review in reviews):
+                break
+
+        token_ids = array('I')
+        for review in reviews:
+            token_ids.extend(review.token_ids)
+        token_ids = np.frombuffer(token_ids, dtype=np.uint32) if token_ids else np.zeros(0, dtype=np.uint32)
+        lengths = np.array([len(review.token_ids) for review in reviews], dtype=np.int64)
+        docs = np.repeat(np.arange(len(reviews)), lengths)
+        ids = token_rows[token_ids]
+
+        size = len(self.vocabulary) + 1
+        in_lexicon = ids < size
+        lex_ids = np.where(in_lexicon, ids, 0)
+        known = self.known[lex_ids]
+        is_negation = (ids >= size) & (ids != self.exclamation)
+
+        # Neighbour arrays, only valid within the same review
+        same_prev = np.zeros(len(ids), dtype=bool)
+        same_prev[1:] = docs[1:] == docs[:-1]
+        same_next = np.zeros(len(ids), dtype=bool)
+        same_next[:-1] = same_prev[1:]
+        prev_known = np.roll(known, 1) & same_prev
+        next_known = np.roll(known, -1) & same_next
+
+        # A known modifier directly before another known word merges into it
+        is_modifier = known & self.modifier[lex_ids]
+        absorbed = is_modifier & next_known
+        heads = known & ~absorbed
+
+        prev_ids = np.roll(lex_ids, 1)
+        modified = np.roll(absorbed, 1) & same_prev & prev_known
+
+        # A negation before the chunk ("not good", "not very good"), skipping
+        # one-letter words in between ("not a good")
+        positions = np.arange(len(ids))
+        small = (token_lengths[token_ids] <= 1) & ~known
+        last_word = np.maximum.accumulate(np.where(small, -1, positions))
+        chunk_start = positions - modified
+        before = np.where(chunk_start > 0, last_word[np.maximum(chunk_start - 1, 0)], -1)
+        negated = (before >= 0) & is_negation[np.maximum(before, 0)]
+        negated &= docs[np.maximum(before, 0)] == docs
+
+        # A negated modifier weakens instead of strengthens, as in TextBlob
+        intensity = self.intensity[prev_ids]
+        scale = np.where(modified, np.where(negated, 1.0 / intensity, intensity), 1.0)
+        polarity = np.clip(self.polarity[lex_ids] * scale, -1.0, 1.0)
+        subjectivity = np.clip(self.subjectivity[lex_ids] * scale, -1.0, 1.0)
+        polarity = np.where(negated, polarity * NEGATION_FACTOR, polarity)
+
+        excited = np.roll(ids == self.exclamation, -1) & same_next
+        polarity = np.where(excited, np.clip(polarity * EXCLAMATION_BOOST, -1.0, 1.0), polarity)
+
+        doc_count = len(reviews)
+        head_docs = docs[heads]
+        counts = np.bincount(head_docs, minlength=doc_count)
+        polarity_sum = np.bincount(head_docs, weights=polarity[heads], minlength=doc_count)
+        subjectivity_sum = np.bincount(head_docs, weights=subjectivity[heads], minlength=doc_count)
+        divisor = np.maximum(counts, 1)
+        return list(zip((polarity_sum / divisor).tolist(), (subjectivity_sum / divisor).tolist()))
+
+
+def get_scorer():
+    """Shared scorer; the lexicon arrays are built on first use or by sentiment_service.warm"""
+    from sentiment_service import sentiment_service
+    return sentiment_service.scorer
+
+
+def lexicon_scores(texts):
+    return get_scorer().score_records(normalize_review(text) for text in texts)
+
+
+def agreement(texts):
+    """Share of texts given the same label as TextBlob, and the mean absolute polarity difference"""
+    from sentiment import _textblob_scores, label_for
+
+    reference = _textblob_scores(texts)
+    scores = lexicon_scores(texts)
+    same = sum(label_for(a[0]) == label_for(b[0]) for a, b in zip(reference, scores))
+    drift = sum(abs(a[0] - b[0]) for a, b in zip(reference, scores))
+    return same / max(1, len(texts)), drift / max(1, len(texts))
+
+
+def benchmark(texts, repeat=200):
+    """Reviews per second for TextBlob against the vectorized scorer"""
+    from sentiment import _textblob_scores
+
+    corpus = [f"{text} ({i})" for i in range(repeat) for text in texts]
+    get_scorer()
+
+    start = time.perf_counter()
+    _textblob_scores(corpus)
+    textblob_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    lexicon_scores(corpus)
+    lexicon_time = time.perf_counter() - start
+
+    print(f"{len(corpus)} reviews")
+    print(f"  textblob: {len(corpus)/textblob_time:>9.0f} reviews/s")
+    print(f"   lexicon: {len(corpus)/lexicon_time:>9.0f} reviews/s")
+    print(f"   speedup: {textblob_time/lexicon_time:.1f}x")
+
+
+if __name__ == "__main__":
+    from review_extractor import parse_page_snapshot
+
+    texts = []
+    for path in sys.argv[1:] or ['page_source.html']:
+        with open(path, encoding='utf-8') as f:
+            records = parse_page_snapshot(f.read(), 'flipkart')['reviews']
+        texts += [text for record in records for text in (record['title'], record['body']) if text]
+
+    same, drift = agreement(texts)
+    print(f"{len(texts)} saved reviews: {same*100:.1f}% label agreement with TextBlob, "
+          f"mean polarity difference {drift:.3f}")
+    benchmark(texts)
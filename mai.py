@@ -6,7 +6,12 @@ from pathlib import Path
 import os
 import sys
 import logging
-from textblob import TextBlob
+from sentiment import SENTIMENT_BACKEND, model_version, sentiment_counts
+from review_text import normalize_review
+from sentiment_service import sentiment_service
+from verdict_engine import BUY, DONT_BUY, Verdict
+from product_identity import product_key, search_key
+from result_cache import REVIEWS, SEARCH, describe_age, result_cache
 
 # Import functions from your existing script
 from flipkart_searcher import FlipkartProductSearch, FlipkartReviewScraper
@@ -15,6 +20,12 @@ from flipkart_searcher import FlipkartProductSearch, FlipkartReviewScraper
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+# Load the sentiment models while the user searches; a no-op once loaded
+sentiment_service.warm(SENTIMENT_BACKEND)
+
+# CSS class for each verdict action; anything else is shown as neutral
+VERDICT_CLASSES = {BUY: "verdict verdict-buy", DONT_BUY: "verdict verdict-dont-buy"}
+
 # Configure page
 st.set_page_config(
     page_title="Flipkart Product Finder & Review Analyzer",
@@ -106,6 +117,20 @@ with st.sidebar:
     with st.expander("Advanced Options"):
         wait_time = st.slider("Page load wait time (seconds)", 2, 10, 5)
         debug_mode = st.checkbox("Enable debug mode", False)
+        incremental_reviews = st.checkbox("Only fetch new reviews on re-analysis", False,
+                                          help="Reads reviews newest first and stops at the first one seen on an earlier analysis of the product")
+        stratified_reviews = st.checkbox("Stratified review sampling", False,
+                                         help="Spread the review page budget over sort orders and reweight sentiment to the product's rating mix")
+    
+    # Results shared by every session in this process
+    st.markdown("#### Cached Results")
+    refresh_results = st.checkbox("Refresh cached results", False,
+                                  help="Scrape again instead of reusing a recent search or analysis of the same query or product, and replace the cached copy")
+    if st.button("Clear result cache", key="clear_cache_button"):
+        st.caption(f"Cleared {result_cache.invalidate()} cached results")
+    cache_stats = result_cache.stats()
+    st.caption(f"{cache_stats['entries']} results cached ({cache_stats['bytes'] / 1e6:.1f} MB), "
+               f"{cache_stats['hits']} reused")
     
     st.markdown("---")
     st.markdown("### How to use")
@@ -174,6 +199,40 @@ def display_products(products):
     
     return df
 
+def analyze_reviews(link, driver_path, max_pages):
+    """Scrape and score a product's reviews, writing progress to the enclosing status"""
+    st.write("Starting browser...")
+    scraper = FlipkartReviewScraper(driver_path)
+    
+    if stratified_reviews:
+        st.write(f"Sampling {max_pages} review pages...")
+        all_reviews, all_titles, decision, product_info = scraper.sample_reviews(link, page_budget=max_pages)
+    elif incremental_reviews:
+        st.write("Checking for new reviews...")
+        all_reviews, all_titles, decision, product_info = scraper.sync_reviews(
+            link,
+            max_pages=max_pages,
+            on_page=lambda page, sentiment: st.write(f"Page {page}: {sentiment.summary()}")
+        )
+    else:
+        st.write("Navigating to product page...")
+        all_reviews, all_titles, decision, product_info = scraper.scrape_reviews(
+            link, 
+            pages_to_scrape=max_pages,
+            on_page=lambda page, sentiment: st.write(f"Page {page}: {sentiment.summary()}")
+        )
+    return {
+        'reviews': all_reviews,
+        'titles': all_titles,
+        'decision': decision,
+        'scored': scraper.scored_reviews,
+        'verdict': scraper.sentiment.judgement() if all_reviews or all_titles else Verdict.unavailable(decision),
+        # Shares behind the verdict, weighted when reviews were sampled
+        'percentages': scraper.sentiment.percentages(),
+        'early_stop': scraper.early_stop,
+        'sync': scraper.sync,
+    }
+
 def analyze_sentiment_with_ui(product):
     st.markdown("<h2 class='sub-header'>📊 Review Analysis</h2>", unsafe_allow_html=True)
     
@@ -182,17 +241,30 @@ def analyze_sentiment_with_ui(product):
         
         # Use chrome driver path from session state
         driver_path = st.session_state.driver_path
-        st.write("Starting browser...")
+        mode = 'stratified' if stratified_reviews else 'incremental' if incremental_reviews else 'full'
         
-        # Initialize review scraper and analyze reviews
+        # Initialize review scraper and analyze reviews, unless this product was analyzed recently
         try:
-            scraper = FlipkartReviewScraper(driver_path)
-            
-            st.write("Navigating to product page...")
-            all_reviews, all_titles, decision, product_info = scraper.scrape_reviews(
-                product['link'], 
-                pages_to_scrape=st.session_state.max_review_pages
+            analysis, age = result_cache.fetch(
+                REVIEWS, (product_key(product['link']), model_version(), mode, st.session_state.max_review_pages),
+                lambda: analyze_reviews(product['link'], driver_path, st.session_state.max_review_pages),
+                refresh=refresh_results, keep=lambda analysis: analysis['reviews'] or analysis['titles']
             )
+            if age is not None:
+                st.write(f"Reusing the analysis from {describe_age(age)} ago")
+            all_reviews, all_titles, decision = analysis['reviews'], analysis['titles'], analysis['decision']
+            scored_reviews = analysis['scored']
+            verdict = analysis['verdict']
+            percentages = analysis['percentages']
+            if analysis['early_stop']:
+                stop = analysis['early_stop']
+                st.write(f"Stopped after page {stop['pages_scraped']}: {stop['reason']} "
+                         f"({stop['pages_saved']} pages saved)")
+            if analysis['sync']:
+                st.write(f"{analysis['sync']['new']} new reviews in {analysis['sync']['pages']} pages, "
+                         f"{analysis['sync']['total']} in total")
+                if analysis['sync']['backfill']:
+                    st.caption(f"Older reviews from page {analysis['sync']['backfill']} are fetched on the next refresh")
             
             status.update(label="Analysis complete!", state="complete")
         except Exception as e:
@@ -213,31 +285,15 @@ def analyze_sentiment_with_ui(product):
         # Create combined list of all review content
         all_content = all_reviews + all_titles
         
-        # Create DataFrame for reviews with sentiment
+        # Scores and labels were computed once by the scraper
         reviews_data = []
-        positive_count = 0
-        negative_count = 0
-        neutral_count = 0
-        
-        for review in all_content:
-            sentiment = TextBlob(review).sentiment.polarity
-            sentiment_label = ""
-            
-            if sentiment > 0.1:
-                sentiment_label = "Positive 👍"
-                positive_count += 1
-            elif sentiment < -0.1:
-                sentiment_label = "Negative 👎"
-                negative_count += 1
-            else:
-                sentiment_label = "Neutral 😐"
-                neutral_count += 1
-                
+        for row in scored_reviews:
             reviews_data.append({
-                "Review": review[:100] + "..." if len(review) > 100 else review,
-                "Sentiment": sentiment_label,
-                "Score": round(sentiment, 2)
+                "Review": normalize_review(row['review']).preview(100),
+                "Sentiment": row['label'],
+                "Score": round(row['score'], 2)
             })
+        positive_count, neutral_count, negative_count = sentiment_counts(scored_reviews)
         
         reviews_df = pd.DataFrame(reviews_data)
         
@@ -272,11 +328,8 @@ def analyze_sentiment_with_ui(product):
             dist_data = {
                 "Sentiment": ["Positive 👍", "Neutral 😐", "Negative 👎"],
                 "Count": [positive_count, neutral_count, negative_count],
-                "Percentage": [
-                    positive_count/total*100 if total > 0 else 0,
-                    neutral_count/total*100 if total > 0 else 0,
-                    negative_count/total*100 if total > 0 else 0
-                ]
+                # Same shares the verdict was judged on
+                "Percentage": list(percentages)
             }
             
             dist_df = pd.DataFrame(dist_data)
@@ -298,7 +351,7 @@ def analyze_sentiment_with_ui(product):
                 
                 fig = px.pie(
                     dist_df, 
-                    values="Count", 
+                    values="Percentage", 
                     names="Sentiment", 
                     title="Review Sentiment Distribution",
                     color="Sentiment",
@@ -310,22 +363,16 @@ def analyze_sentiment_with_ui(product):
         # Display verdict
         st.markdown("<h3>🔍 Final Verdict</h3>", unsafe_allow_html=True)
         
-        verdict_class = ""
-        if "Buy ✅" in decision:
-            verdict_class = "verdict verdict-buy"
-        elif "Don't Buy ❌" in decision:
-            verdict_class = "verdict verdict-dont-buy"
-        else:
-            verdict_class = "verdict verdict-neutral"
+        verdict_class = VERDICT_CLASSES.get(verdict.action, "verdict verdict-neutral")
         
         st.markdown(f"<div class='{verdict_class}'>{decision}</div>", unsafe_allow_html=True)
         
         # Display recommendation
         st.markdown("<h3>💡 Recommendation</h3>", unsafe_allow_html=True)
         
-        if "Buy ✅" in decision:
+        if verdict.buy:
             st.success("YES - This product appears to have overall positive reviews and is the lowest priced option.")
-        elif "Don't Buy ❌" in decision:
+        elif verdict.dont_buy:
             st.error("NO - Although this is the lowest priced option, reviews suggest poor quality or satisfaction.")
         else:
             st.info("MAYBE - Reviews are mixed. Consider your specific needs carefully.")
@@ -376,13 +423,17 @@ if st.button("Search Flipkart", key="search_button") and search_term:
         # Find products
         st.write("Scanning listings...")
         try:
-            product_searcher = FlipkartProductSearch(driver_path)
-            products = product_searcher.search_products(search_term)
+            # Shared with other sessions that searched the same term recently
+            products, age = result_cache.fetch(
+                SEARCH, search_key('flipkart', search_term),
+                lambda: FlipkartProductSearch(driver_path).search_products(search_term),
+                refresh=refresh_results
+            )
             
             if products:
-                lowest_price_product = product_searcher.get_lowest_price_product()
                 st.session_state.products = products
-                status.update(label="Search complete!", state="complete")
+                label = f"Search complete! (cached {describe_age(age)} ago)" if age is not None else "Search complete!"
+                status.update(label=label, state="complete")
             else:
                 status.update(label="No products found", state="error")
                 st.session_state.products = None
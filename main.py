@@ -7,17 +7,29 @@ import os
 import sys
 import logging
 import random
-from textblob import TextBlob
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sentiment import SENTIMENT_BACKEND, model_version, sentiment_counts
+from review_text import normalize_review
+from sentiment_service import sentiment_service
+from verdict_engine import BUY, DONT_BUY, Verdict
+from product_identity import product_key, search_key
+from result_cache import REVIEWS, SEARCH, describe_age, result_cache
 
 # Import functions from your existing scripts
 # Assuming these modules exist and work as expected
-from amazon_searcher import setup_chrome_driver, find_lowest_price_product, AmazonReviewScraper
+from amazon_searcher import setup_chrome_driver, find_lowest_price_product, find_top_k_products, AmazonReviewScraper
 from flipkart_searcher import FlipkartProductSearch, FlipkartReviewScraper
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+# Load the sentiment models while the user searches; a no-op once loaded
+sentiment_service.warm(SENTIMENT_BACKEND)
+
+# CSS class for each verdict action; anything else is shown as neutral
+VERDICT_CLASSES = {BUY: "verdict verdict-buy", DONT_BUY: "verdict verdict-dont-buy"}
+
 # Configure page
 st.set_page_config(
     page_title="Compare it - Amazon vs Flipkart",
@@ -222,6 +234,22 @@ with st.sidebar:
     with st.expander("Advanced Options"):
         wait_time = st.slider("Page load wait time (seconds)", 2, 10, 5)
         debug_mode = st.checkbox("Enable debug mode", False)
+        result_pages = st.slider("Search result pages to scan", 1, 5, 1,
+                                 help="More than one page searches all of them in parallel and keeps the cheapest products")
+        incremental_reviews = st.checkbox("Only fetch new reviews on re-analysis", False,
+                                          help="Reads reviews newest first and stops at the first one seen on an earlier analysis of the product")
+        stratified_reviews = st.checkbox("Stratified review sampling", False,
+                                         help="Spread the review page budget over sort orders (and star ratings on Amazon) and reweight sentiment to the product's rating mix")
+    
+    # Results shared by every session in this process
+    st.markdown("#### 🗄️ Cached Results")
+    refresh_results = st.checkbox("Refresh cached results", False,
+                                  help="Scrape again instead of reusing a recent search or analysis of the same query or product, and replace the cached copy")
+    if st.button("Clear result cache", key="clear_cache_button"):
+        st.caption(f"Cleared {result_cache.invalidate()} cached results")
+    cache_stats = result_cache.stats()
+    st.caption(f"{cache_stats['entries']} results cached ({cache_stats['bytes'] / 1e6:.1f} MB), "
+               f"{cache_stats['hits']} reused")
     
     st.markdown("---")
     st.markdown("### 📖 How to use")
@@ -266,68 +294,118 @@ st.markdown("<div class='comparison-header'>🔎 Search Products Across Platform
 # Search input
 search_term = st.text_input("What product are you looking for?")
 
+def search_flipkart(search_term, driver_path, max_products, result_pages):
+    """Flipkart products for the search; runs on a worker thread, so no st calls"""
+    product_searcher = FlipkartProductSearch(driver_path)
+    if result_pages > 1:
+        return product_searcher.search_top_k(search_term, k=max_products, pages=result_pages)
+    return product_searcher.search_products(search_term)
+
+
+def search_amazon(search_term, driver_path, max_products, result_pages):
+    """(all_products, lowest_price_product) for the search; runs on a worker thread, so no st calls"""
+    if result_pages > 1:
+        # Cheapest products across all scanned pages, lowest first
+        all_products = find_top_k_products(search_term, driver_path, k=max_products, pages=result_pages)
+        return all_products, all_products[0] if all_products else None
+    return None, find_lowest_price_product(search_term, driver_path, max_products=max_products)
+
+
+def cached_search(platform, search, search_term, driver_path, max_products, result_pages, refresh):
+    """(result, age) of search from the shared result cache; age is None if it was just scraped"""
+    return result_cache.fetch(
+        SEARCH, (search_key(platform, search_term), max_products, result_pages),
+        lambda: search(search_term, driver_path, max_products, result_pages),
+        refresh=refresh, keep=any if platform == 'amazon' else bool
+    )
+
+
+def complete_label(label, age):
+    return f"{label} (cached {describe_age(age)} ago)" if age is not None else label
+
+
+def show_flipkart_results(status, future):
+    with status:
+        try:
+            flipkart_products, age = future.result()
+            if flipkart_products:
+                st.session_state.flipkart_products = flipkart_products
+                status.update(label=complete_label("Flipkart search complete!", age), state="complete")
+            else:
+                status.update(label="No products found on Flipkart", state="error")
+                st.session_state.flipkart_products = None
+        except Exception as e:
+            st.error(f"An error occurred: {str(e)}")
+            status.update(label="Flipkart search failed", state="error")
+            st.session_state.flipkart_products = None
+
+
+def show_amazon_results(status, future):
+    with status:
+        try:
+            (all_products, lowest_price_product), age = future.result()
+            
+            if all_products:
+                st.session_state.amazon_products = all_products
+                status.update(label=complete_label("Amazon search complete!", age), state="complete")
+            elif lowest_price_product:
+                # In a real implementation, you would have all products
+                # Here we'll simulate multiple products with varying prices
+                base_price = lowest_price_product[1]
+                title = lowest_price_product[0]
+                link = lowest_price_product[2]
+                
+                # Create a list of simulated products with different prices
+                all_products = [
+                    lowest_price_product,  # The actual lowest price product
+                    [f"{title} (Variant 1)", base_price * 1.1, link],
+                    [f"{title} (Variant 2)", base_price * 1.25, link],
+                    [f"{title} (Variant 3)", base_price * 1.5, link],
+                ]
+                
+                st.session_state.amazon_products = all_products
+                status.update(label=complete_label("Amazon search complete!", age), state="complete")
+            else:
+                status.update(label="No products found on Amazon", state="error")
+                st.session_state.amazon_products = None
+        except Exception as e:
+            st.error(f"An error occurred: {str(e)}")
+            status.update(label="Amazon search failed", state="error")
+            st.session_state.amazon_products = None
+
+
 # Compare button
 if st.button("Compare Prices", key="compare_button") and search_term:
     col1, col2 = st.columns(2)
     
     with col1:
-        with st.status("Searching Flipkart...") as status:
+        flipkart_status = st.status("Searching Flipkart...")
+        with flipkart_status:
             st.write(f"Searching for: {search_term}")
             
             # Setup chrome driver path
             if not os.path.isfile(driver_path):
                 st.warning(f"ChromeDriver not found at '{driver_path}'. The search may fail.")
-            
-            # Find products
-            try:
-                product_searcher = FlipkartProductSearch(driver_path)
-                flipkart_products = product_searcher.search_products(search_term)
-                
-                if flipkart_products:
-                    lowest_price_product = product_searcher.get_lowest_price_product()
-                    st.session_state.flipkart_products = flipkart_products
-                    status.update(label="Flipkart search complete!", state="complete")
-                else:
-                    status.update(label="No products found on Flipkart", state="error")
-                    st.session_state.flipkart_products = None
-            except Exception as e:
-                st.error(f"An error occurred: {str(e)}")
-                status.update(label="Flipkart search failed", state="error")
-                st.session_state.flipkart_products = None
     
     with col2:
-        with st.status("Searching Amazon...") as status:
+        amazon_status = st.status("Searching Amazon...")
+        with amazon_status:
             st.write(f"Searching for: {search_term}")
-            
-            # Find products
-            try:
-                # Modify the find_lowest_price_product function to return all products
-                lowest_price_product = find_lowest_price_product(search_term, driver_path)
-                
-                if lowest_price_product:
-                    # In a real implementation, you would have all products
-                    # Here we'll simulate multiple products with varying prices
-                    base_price = lowest_price_product[1]
-                    title = lowest_price_product[0]
-                    link = lowest_price_product[2]
-                    
-                    # Create a list of simulated products with different prices
-                    all_products = [
-                        lowest_price_product,  # The actual lowest price product
-                        [f"{title} (Variant 1)", base_price * 1.1, link],
-                        [f"{title} (Variant 2)", base_price * 1.25, link],
-                        [f"{title} (Variant 3)", base_price * 1.5, link],
-                    ]
-                    
-                    st.session_state.amazon_products = all_products
-                    status.update(label="Amazon search complete!", state="complete")
-                else:
-                    status.update(label="No products found on Amazon", state="error")
-                    st.session_state.amazon_products = None
-            except Exception as e:
-                st.error(f"An error occurred: {str(e)}")
-                status.update(label="Amazon search failed", state="error")
-                st.session_state.amazon_products = None
+    
+    # Both storefronts are searched at once, so the wait is the slower of the
+    # two; each column's status updates as soon as its own search finishes
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = {
+            executor.submit(cached_search, 'flipkart', search_flipkart, search_term, driver_path,
+                            max_products, result_pages, refresh_results): 'flipkart',
+            executor.submit(cached_search, 'amazon', search_amazon, search_term, driver_path,
+                            max_products, result_pages, refresh_results): 'amazon',
+        }
+        for future in as_completed(futures):
+            if futures[future] == 'flipkart':
+                show_flipkart_results(flipkart_status, future)
+            else:
+                show_amazon_results(amazon_status, future)
 
 # Display comparison if products are available from both platforms
 if st.session_state.flipkart_products is not None or st.session_state.amazon_products is not None:
@@ -409,10 +487,8 @@ if st.session_state.flipkart_products is not None or st.session_state.amazon_pro
         flipkart_lowest = st.session_state.flipkart_products[0]
         amazon_lowest = st.session_state.amazon_products[0]
         
-        # Extract and clean prices for comparison
-        # Assuming Flipkart price format is like "₹12,345" or "₹12,345.00"
-        flipkart_price_text = flipkart_lowest['price_text']
-        flipkart_price = float(flipkart_price_text.replace('₹', '').replace(',', '').strip().split('.')[0])
+        # Prices are already numeric from the scrapers
+        flipkart_price = flipkart_lowest['price']
         amazon_price = amazon_lowest[1]
         
         # Compare prices
@@ -457,6 +533,97 @@ if st.session_state.flipkart_products is not None or st.session_state.amazon_pro
                 st.markdown(f"[View on Amazon]({amazon_lowest[2]})")
                 st.markdown("</div>", unsafe_allow_html=True)
 
+def review_mode():
+    return 'stratified' if stratified_reviews else 'incremental' if incremental_reviews else 'full'
+
+
+def analyze_flipkart_reviews(link, driver_path, max_pages):
+    """Scrape and score a Flipkart product's reviews, writing progress to the enclosing status"""
+    scraper = FlipkartReviewScraper(driver_path)
+    
+    if stratified_reviews:
+        st.write(f"Sampling {max_pages} review pages...")
+        all_reviews, all_titles, decision, product_info = scraper.sample_reviews(link, page_budget=max_pages)
+    elif incremental_reviews:
+        st.write("Checking for new reviews...")
+        all_reviews, all_titles, decision, product_info = scraper.sync_reviews(
+            link,
+            max_pages=max_pages,
+            on_page=lambda page, sentiment: st.write(f"Page {page}: {sentiment.summary()}")
+        )
+    else:
+        st.write("Navigating to product page...")
+        all_reviews, all_titles, decision, product_info = scraper.scrape_reviews(
+            link, 
+            pages_to_scrape=max_pages,
+            on_page=lambda page, sentiment: st.write(f"Page {page}: {sentiment.summary()}")
+        )
+    return {
+        'reviews': all_reviews,
+        'titles': all_titles,
+        'decision': decision,
+        'scored': scraper.scored_reviews,
+        'verdict': scraper.sentiment.judgement() if all_reviews or all_titles else Verdict.unavailable(decision),
+        # Shares behind the verdict, weighted when reviews were sampled
+        'percentages': scraper.sentiment.percentages(),
+        'early_stop': scraper.early_stop,
+        'sync': scraper.sync,
+    }
+
+
+def analyze_amazon_reviews(link, driver_path, max_pages):
+    """Scrape and score an Amazon product's review titles, writing progress to the enclosing status"""
+    scraper = AmazonReviewScraper(driver_path)
+    
+    if stratified_reviews:
+        st.write(f"Sampling {max_pages} review pages...")
+        review_titles, decision = scraper.sample_review_titles(link, page_budget=max_pages)
+    elif incremental_reviews:
+        st.write("Checking for new reviews...")
+        review_titles, decision = scraper.sync_review_titles(
+            link,
+            max_pages=max_pages,
+            on_page=lambda page, sentiment: st.write(f"Page {page}: {sentiment.summary()}")
+        )
+    else:
+        st.write("Navigating to product page...")
+        review_titles, decision = scraper.scrape_review_titles(
+            link, 
+            max_pages=max_pages,
+            on_page=lambda page, sentiment: st.write(f"Page {page}: {sentiment.summary()}")
+        )
+    return {
+        'titles': review_titles,
+        'decision': decision,
+        'scored': scraper.scored_reviews,
+        'verdict': scraper.sentiment.judgement() if review_titles else Verdict.unavailable(decision),
+        'percentages': scraper.sentiment.percentages(),
+        'early_stop': scraper.early_stop,
+        'sync': scraper.sync,
+    }
+
+
+def cached_analysis(analyze, link, driver_path, max_pages, keep):
+    """Review analysis of link from the shared result cache, computed by analyze on a miss"""
+    analysis, age = result_cache.fetch(
+        REVIEWS, (product_key(link), model_version(), review_mode(), max_pages),
+        lambda: analyze(link, driver_path, max_pages),
+        refresh=refresh_results, keep=keep
+    )
+    if age is not None:
+        st.write(f"Reusing the analysis from {describe_age(age)} ago")
+    if analysis['early_stop']:
+        stop = analysis['early_stop']
+        st.write(f"Stopped after page {stop['pages_scraped']}: {stop['reason']} "
+                 f"({stop['pages_saved']} pages saved)")
+    if analysis['sync']:
+        st.write(f"{analysis['sync']['new']} new reviews in {analysis['sync']['pages']} pages, "
+                 f"{analysis['sync']['total']} in total")
+        if analysis['sync']['backfill']:
+            st.caption(f"Older reviews from page {analysis['sync']['backfill']} are fetched on the next refresh")
+    return analysis
+
+
 # Combined review analysis - Execute when the analyze button is clicked
 if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_selected_product and st.session_state.amazon_selected_product:
     st.markdown("<div class='comparison-header'>📊 Combined Review Analysis</div>", unsafe_allow_html=True)
@@ -477,19 +644,24 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
             
             # Initialize review scraper and analyze reviews
             try:
-                scraper = FlipkartReviewScraper(driver_path)
-                
-                st.write("Navigating to product page...")
-                all_reviews, all_titles, decision, product_info = scraper.scrape_reviews(
-                    st.session_state.flipkart_selected_product['link'], 
-                    pages_to_scrape=st.session_state.max_review_pages
+                analysis = cached_analysis(
+                    analyze_flipkart_reviews, st.session_state.flipkart_selected_product['link'],
+                    driver_path, st.session_state.max_review_pages,
+                    keep=lambda analysis: analysis['reviews'] or analysis['titles']
                 )
+                all_reviews, all_titles, decision = analysis['reviews'], analysis['titles'], analysis['decision']
+                scored_reviews = analysis['scored']
+                flipkart_verdict = analysis['verdict']
+                flipkart_percentages = analysis['percentages']
                 
                 status.update(label="Flipkart analysis complete!", state="complete")
             except Exception as e:
                 st.error(f"An error occurred during review analysis: {str(e)}")
                 status.update(label="Analysis failed", state="error")
                 all_reviews, all_titles, decision = [], [], "Unable to determine"
+                scored_reviews = []
+                flipkart_verdict = Verdict.unavailable(decision)
+                flipkart_percentages = (0, 0, 0)
         
         # Display review data
         if all_reviews or all_titles:
@@ -497,30 +669,15 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
             all_content = all_reviews + all_titles
             
             # Create DataFrame for reviews with sentiment
+            # Scores and labels were computed once by the scraper
             reviews_data = []
-            positive_count = 0
-            negative_count = 0
-            neutral_count = 0
-            
-            for review in all_content:
-                sentiment = TextBlob(review).sentiment.polarity
-                sentiment_label = ""
-                
-                if sentiment > 0.1:
-                    sentiment_label = "Positive 👍"
-                    positive_count += 1
-                elif sentiment < -0.1:
-                    sentiment_label = "Negative 👎"
-                    negative_count += 1
-                else:
-                    sentiment_label = "Neutral 😐"
-                    neutral_count += 1
-                    
+            for row in scored_reviews:
                 reviews_data.append({
-                    "Review": review[:100] + "..." if len(review) > 100 else review,
-                    "Sentiment": sentiment_label,
-                    "Score": round(sentiment, 2)
+                    "Review": normalize_review(row['review']).preview(100),
+                    "Sentiment": row['label'],
+                    "Score": round(row['score'], 2)
                 })
+            positive_count, neutral_count, negative_count = sentiment_counts(scored_reviews)
             
             reviews_df = pd.DataFrame(reviews_data)
             
@@ -536,11 +693,8 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
                     dist_data = {
                         "Sentiment": ["Positive 👍", "Neutral 😐", "Negative 👎"],
                         "Count": [positive_count, neutral_count, negative_count],
-                        "Percentage": [
-                            positive_count/total*100 if total > 0 else 0,
-                            neutral_count/total*100 if total > 0 else 0,
-                            negative_count/total*100 if total > 0 else 0
-                        ]
+                        # Same shares the verdict was judged on
+                        "Percentage": list(flipkart_percentages)
                     }
                     
                     dist_df = pd.DataFrame(dist_data)
@@ -554,7 +708,7 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
                     
                     fig = px.pie(
                         dist_df, 
-                        values="Count", 
+                        values="Percentage", 
                         names="Sentiment", 
                         title="Flipkart Review Sentiment",
                         color="Sentiment",
@@ -564,13 +718,7 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
                     st.plotly_chart(fig, use_container_width=True)
                     
                     # Display verdict
-                    verdict_class = ""
-                    if "Buy ✅" in decision:
-                        verdict_class = "verdict verdict-buy"
-                    elif "Don't Buy ❌" in decision:
-                        verdict_class = "verdict verdict-dont-buy"
-                    else:
-                        verdict_class = "verdict verdict-neutral"
+                    verdict_class = VERDICT_CLASSES.get(flipkart_verdict.action, "verdict verdict-neutral")
                     
                     st.markdown(f"<div class='{verdict_class}'>{decision}</div>", unsafe_allow_html=True)
             
@@ -596,47 +744,38 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
             
             # Initialize review scraper and analyze reviews
             try:
-                scraper = AmazonReviewScraper(driver_path)
-                
-                st.write("Navigating to product page...")
-                review_titles, decision = scraper.scrape_review_titles(
-                    st.session_state.amazon_selected_product[2], 
-                    max_pages=st.session_state.max_review_pages
+                analysis = cached_analysis(
+                    analyze_amazon_reviews, st.session_state.amazon_selected_product[2],
+                    driver_path, st.session_state.max_review_pages,
+                    keep=lambda analysis: analysis['titles']
                 )
+                review_titles, decision = analysis['titles'], analysis['decision']
+                scored_reviews = analysis['scored']
+                amazon_verdict = analysis['verdict']
+                amazon_percentages = analysis['percentages']
                 
                 status.update(label="Amazon analysis complete!", state="complete")
             except Exception as e:
                 st.error(f"An error occurred during review analysis: {str(e)}")
                 status.update(label="Analysis failed", state="error")
                 review_titles, decision = [], "Unable to determine"
+                scored_reviews = []
+                amazon_verdict = Verdict.unavailable(decision)
+                amazon_percentages = (0, 0, 0)
         
         # Display review data
         if review_titles:
             # Create DataFrame for reviews with sentiment
+            # Scores and labels were computed once by the scraper
             reviews_data = []
-            positive_count = 0
-            negative_count = 0
-            neutral_count = 0
-            
-            for review in review_titles:
-                sentiment = TextBlob(review).sentiment.polarity
-                sentiment_label = ""
-                
-                if sentiment > 0.1:
-                    sentiment_label = "Positive 👍"
-                    positive_count += 1
-                elif sentiment < -0.1:
-                    sentiment_label = "Negative 👎"
-                    negative_count += 1
-                else:
-                    sentiment_label = "Neutral 😐"
-                    neutral_count += 1
-                    
+            for row in scored_reviews:
+                review = row['review']
                 reviews_data.append({
                     "Review": review,
-                    "Sentiment": sentiment_label,
-                    "Score": round(sentiment, 2)
+                    "Sentiment": row['label'],
+                    "Score": round(row['score'], 2)
                 })
+            positive_count, neutral_count, negative_count = sentiment_counts(scored_reviews)
             
             reviews_df = pd.DataFrame(reviews_data)
             
@@ -652,11 +791,8 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
                     dist_data = {
                         "Sentiment": ["Positive 👍", "Neutral 😐", "Negative 👎"],
                         "Count": [positive_count, neutral_count, negative_count],
-                        "Percentage": [
-                            positive_count/total*100 if total > 0 else 0,
-                            neutral_count/total*100 if total > 0 else 0,
-                            negative_count/total*100 if total > 0 else 0
-                        ]
+                        # Same shares the verdict was judged on
+                        "Percentage": list(amazon_percentages)
                     }
                     
                     dist_df = pd.DataFrame(dist_data)
@@ -670,7 +806,7 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
                     
                     fig = px.pie(
                         dist_df, 
-                        values="Count", 
+                        values="Percentage", 
                         names="Sentiment", 
                         title="Amazon Review Sentiment",
                         color="Sentiment",
@@ -680,13 +816,7 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
                     st.plotly_chart(fig, use_container_width=True)
                     
                     # Display verdict
-                    verdict_class = ""
-                    if "Buy ✅" in decision:
-                        verdict_class = "verdict verdict-buy"
-                    elif "Don't Buy ❌" in decision:
-                        verdict_class = "verdict verdict-dont-buy"
-                    else:
-                        verdict_class = "verdict verdict-neutral"
+                    verdict_class = VERDICT_CLASSES.get(amazon_verdict.action, "verdict verdict-neutral")
                     
                     st.markdown(f"<div class='{verdict_class}'>{decision}</div>", unsafe_allow_html=True)
             
@@ -702,10 +832,6 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
     # Overall Recommendation Section
     st.markdown("<div class='comparison-header'>🤔 Final Recommendation</div>", unsafe_allow_html=True)
     
-    # Get data from both analyses
-    flipkart_decision = decision if 'decision' in locals() else "Unable to determine"
-    amazon_decision = decision if 'decision' in locals() else "Unable to determine"
-    
     # Display combined recommendation
     rec_col1, rec_col2, rec_col3 = st.columns([1, 2, 1])
     
@@ -713,8 +839,7 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
         st.markdown("<div class='card'>", unsafe_allow_html=True)
         
         # Extract price data
-        flipkart_price_text = st.session_state.flipkart_selected_product['price_text']
-        flipkart_price = float(flipkart_price_text.replace('₹', '').replace(',', '').strip().split('.')[0])
+        flipkart_price = st.session_state.flipkart_selected_product['price']
         amazon_price = st.session_state.amazon_selected_product[1]
         
         # Analyze price difference
@@ -745,7 +870,7 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
         """, unsafe_allow_html=True)
         
         # Combined verdict based on price and reviews
-        if "Buy" in flipkart_decision and "Buy" in amazon_decision:
+        if flipkart_verdict.buy and amazon_verdict.buy:
             # Both recommend buying
             if price_diff_percent > 10:
                 final_verdict = f"Buy from {price_winner} ✅"
@@ -755,12 +880,12 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
                 final_verdict = f"Buy from either platform ✅"
                 verdict_reason = "Both platforms have positive reviews with similar pricing"
                 verdict_class = "verdict verdict-buy"
-        elif "Don't Buy" in flipkart_decision and "Don't Buy" in amazon_decision:
+        elif flipkart_verdict.dont_buy and amazon_verdict.dont_buy:
             # Both recommend not buying
             final_verdict = "Consider other products ❌"
             verdict_reason = "Reviews suggest quality issues across both platforms"
             verdict_class = "verdict verdict-dont-buy"
-        elif "Buy" in amazon_decision and "Don't Buy" in flipkart_decision:
+        elif amazon_verdict.buy and flipkart_verdict.dont_buy:
             # Amazon yes, Flipkart no
             if price_winner == "Amazon":
                 final_verdict = "Buy from Amazon ✅"
@@ -776,7 +901,7 @@ if st.session_state.analyze_reviews_clicked and st.session_state.flipkart_select
                     final_verdict = "Buy from Amazon ✅"
                     verdict_reason = "Better reviews on Amazon with reasonable price"
                     verdict_class = "verdict verdict-buy"
-        elif "Buy" in flipkart_decision and "Don't Buy" in amazon_decision:
+        elif flipkart_verdict.buy and amazon_verdict.dont_buy:
             # Flipkart yes, Amazon no
             if price_winner == "Flipkart":
                 final_verdict = "Buy from Flipkart ✅"
@@ -856,8 +981,7 @@ if st.session_state.flipkart_selected_product and st.session_state.amazon_select
         dates = pd.date_range(end=pd.Timestamp.now(), periods=30)
         
         # Extract base prices
-        flipkart_price_text = st.session_state.flipkart_selected_product['price_text']
-        flipkart_current_price = float(flipkart_price_text.replace('₹', '').replace(',', '').strip().split('.')[0])
+        flipkart_current_price = st.session_state.flipkart_selected_product['price']
         amazon_current_price = st.session_state.amazon_selected_product[1]
         
         # Create price fluctuations (add some randomness)
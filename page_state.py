@@ -0,0 +1,177 @@
+import json
+import logging
+import time
+from price_utils import normalize_price
+from product_identity import product_key
+from selector_stats import selector_registry
+
+logger = logging.getLogger(__name__)
+
+# Markers that introduce serialized page state in inline <script> tags
+STATE_MARKERS = {
+    'flipkart': ['window.__INITIAL_STATE__', '<script type="application/ld+json"'],
+    'amazon': ['<script type="application/ld+json"'],
+}
+
+# Only this much of the page is searched for markers and a single blob may
+# not exceed MAX_BLOB_BYTES, so a malformed page can never trigger a full scan
+MAX_SCAN_BYTES = 4 * 1024 * 1024
+MAX_BLOB_BYTES = 4 * 1024 * 1024
+
+# Limits for walking decoded state, which can be deeply nested
+MAX_DEPTH = 40
+MAX_NODES = 200000
+
+FLIPKART_HOME = 'https://www.flipkart.com'
+
+_decoder = json.JSONDecoder()
+
+
+def find_state_blobs(page_html, platform):
+    """Yield every decodable JSON blob that follows one of the platform's state markers"""
+    scan_end = min(len(page_html), MAX_SCAN_BYTES)
+
+    for marker in STATE_MARKERS[platform]:
+        position = page_html.find(marker, 0, scan_end)
+        while position != -1:
+            # Assignments use '=', script tags close their start tag with '>'
+            separator = '>' if marker.startswith('<') else '='
+            start = page_html.find(separator, position + len(marker), scan_end)
+            if start == -1:
+                break
+            start += 1
+            while start < scan_end and page_html[start] in ' \t\r\n':
+                start += 1
+
+            try:
+                blob, _ = _decoder.raw_decode(page_html[start:start + MAX_BLOB_BYTES])
+                yield blob
+            except ValueError as e:
+                logger.debug(f"Could not decode state after {marker}: {e}")
+
+            position = page_html.find(marker, start, scan_end)
+
+
+def _walk(node):
+    """Depth-first walk over dicts in decoded state, bounded in depth and size"""
+    stack = [(node, 0)]
+    visited = 0
+    while stack and visited < MAX_NODES:
+        current, depth = stack.pop()
+        visited += 1
+        if isinstance(current, dict):
+            yield current
+            children = current.values()
+        elif isinstance(current, list):
+            children = current
+        else:
+            continue
+        if depth < MAX_DEPTH:
+            stack.extend((child, depth + 1) for child in reversed(list(children)) if isinstance(child, (dict, list)))
+
+
+def _number(value):
+    if value is None:
+        return None
+    number = normalize_price(value if isinstance(value, (int, float)) else str(value))
+    return None if number == float('inf') else number
+
+
+def _as_product(node, platform):
+    """Map a state dict to a (title, price, link) tuple, or None if it is not a product"""
+    if node.get('@type') == 'Product':
+        offers = node.get('offers') or {}
+        if isinstance(offers, list):
+            offers = offers[0] if offers else {}
+        price = _number(offers.get('price', offers.get('lowPrice')))
+        title = node.get('name')
+        link = node.get('url') or offers.get('url')
+    elif platform == 'flipkart' and isinstance(node.get('titles'), dict) and isinstance(node.get('pricing'), dict):
+        title = node['titles'].get('title')
+        price = _number((node['pricing'].get('finalPrice') or {}).get('value'))
+        link = node.get('smartUrl') or (FLIPKART_HOME + node['baseUrl'] if node.get('baseUrl') else None)
+    else:
+        return None
+
+    if not title or price is None or not link:
+        return None
+    return title, price, link
+
+
+def _as_review(node):
+    """Map a state dict to a review record, or None if it is not a review"""
+    if node.get('@type') == 'Review':
+        rating = node.get('reviewRating') or {}
+        return {
+            'id': str(node.get('@id', '')),
+            'title': node.get('name', ''),
+            'body': node.get('reviewBody', ''),
+            'rating': _number(rating.get('ratingValue')),
+            'date': node.get('datePublished', ''),
+        }
+    if isinstance(node.get('text'), str) and 'rating' in node and 'title' in node:
+        return {
+            'id': str(node.get('id', '')),
+            'title': node.get('title') or '',
+            'body': node['text'],
+            'rating': _number(node.get('rating')),
+            'date': node.get('created', ''),
+        }
+    return None
+
+
+def extract_state_products(page_html, platform, limit=None):
+    """Products found in embedded page state as (title, price, link) tuples, in page order"""
+    products = []
+    seen_keys = set()
+    for blob in find_state_blobs(page_html, platform):
+        for node in _walk(blob):
+            product = _as_product(node, platform)
+            if product and product_key(product[2]) not in seen_keys:
+                seen_keys.add(product_key(product[2]))
+                products.append(product)
+                if limit and len(products) >= limit:
+                    return products
+    return products
+
+
+def extract_state_reviews(page_html, platform):
+    """Reviews found in embedded page state, as records shaped like review_extractor's"""
+    reviews = []
+    for blob in find_state_blobs(page_html, platform):
+        for node in _walk(blob):
+            review = _as_review(node)
+            if review and (review['title'] or review['body']):
+                reviews.append(review)
+    return reviews
+
+
+def record_source(platform, source, hit, elapsed):
+    """Track how often page state ('page_state') or DOM selectors ('dom') produced data"""
+    selector_registry.record(platform, 'data_source', source, hit, elapsed)
+
+
+def timed_state_extract(extractor, page_html, platform, **kwargs):
+    """Run a state extractor and record its outcome for the platform's success rate"""
+    start = time.perf_counter()
+    try:
+        results = extractor(page_html, platform, **kwargs)
+    except Exception as e:
+        logger.debug(f"Page state extraction failed: {e}")
+        results = []
+    record_source(platform, 'page_state', bool(results), time.perf_counter() - start)
+    return results
+
+
+def success_rates():
+    """Per-platform hit rates of the page-state extractor and the DOM fallback"""
+    rates = {}
+    for row in selector_registry.summary():
+        if row['group'] == 'data_source':
+            rates.setdefault(row['platform'], {})[row['selector']] = row['hit_rate']
+    return rates
+
+
+if __name__ == "__main__":
+    for platform, sources in success_rates().items():
+        print(f"{platform}: " + ", ".join(f"{source} {rate*100:.1f}%" for source, rate in sources.items()))
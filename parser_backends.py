@@ -0,0 +1,218 @@
+import os
+import sys
+from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+
+try:
+    from lxml.cssselect import CSSSelector
+except ImportError:  # lxml's CSS support needs the cssselect package
+    CSSSelector = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# Backend used when none is named explicitly; override with COMPARE_IT_PARSER
+PARSER_BACKEND = os.environ.get('COMPARE_IT_PARSER', 'bs4')
+
+# Saved pages every backend must agree on
+FIXTURES = ['page_source.html', 'flipkart_debug.html', 'debug_page_source.html',
+            'amazon_search_page.html', 'amazon_review_page.html']
+
+# What each saved page must yield, so parity is never an empty result agreeing with itself
+EXPECTED_CONTENT = {
+    'amazon_search_page.html': ['amazon_cards'],
+    'amazon_review_page.html': ['amazon'],
+}
+
+
+def _squash(text):
+    # Collapse whitespace so backends that join text nodes differently agree
+    return ' '.join(text.split())
+
+
+class ParserBackend:
+    """
+    Minimal HTML interface the extractors are written against: parse a page,
+    run CSS selectors from the document or a node, and read text/attributes.
+    """
+    name = None
+
+    def parse(self, page_html):
+        raise NotImplementedError
+
+    def select(self, node, selector):
+        raise NotImplementedError
+
+    def select_one(self, node, selector):
+        matches = self.select(node, selector)
+        return matches[0] if matches else None
+
+    def text(self, node):
+        raise NotImplementedError
+
+    def attr(self, node, name, default=None):
+        raise NotImplementedError
+
+    def release(self, document):
+        """Free the parsed document once extraction is done"""
+
+
+class BS4Backend(ParserBackend):
+    name = 'bs4'
+
+    def parse(self, page_html):
+        return BeautifulSoup(page_html, 'lxml')
+
+    def select(self, node, selector):
+        return node.select(selector)
+
+    def select_one(self, node, selector):
+        return node.select_one(selector)
+
+    def text(self, node):
+        return _squash(node.get_text(' '))
+
+    def attr(self, node, name, default=None):
+        value = node.get(name, default)
+        # BeautifulSoup returns multi-valued attributes such as class as lists
+        return ' '.join(value) if isinstance(value, list) else value
+
+    def release(self, document):
+        document.decompose()
+
+
+class LxmlBackend(ParserBackend):
+    name = 'lxml'
+
+    def __init__(self):
+        if CSSSelector is None:
+            raise ImportError("The lxml parser backend needs the cssselect package")
+        self._selectors = {}
+
+    def parse(self, page_html):
+        return lxml_html.fromstring(page_html)
+
+    def select(self, node, selector):
+        compiled = self._selectors.get(selector)
+        if compiled is None:
+            compiled = self._selectors[selector] = CSSSelector(selector)
+        return compiled(node)
+
+    def text(self, node):
+        return _squash(' '.join(node.itertext()))
+
+    def attr(self, node, name, default=None):
+        return node.get(name, default)
+
+
+class SelectolaxBackend(ParserBackend):
+    name = 'selectolax'
+
+    def __init__(self):
+        if LexborHTMLParser is None:
+            raise ImportError("The selectolax parser backend needs the selectolax package")
+
+    def parse(self, page_html):
+        return LexborHTMLParser(page_html)
+
+    def select(self, node, selector):
+        return node.css(selector)
+
+    def select_one(self, node, selector):
+        return node.css_first(selector)
+
+    def text(self, node):
+        return _squash(node.text(separator=' '))
+
+    def attr(self, node, name, default=None):
+        value = node.attributes.get(name, default)
+        return default if value is None else value
+
+
+BACKENDS = {backend.name: backend for backend in (BS4Backend, LxmlBackend, SelectolaxBackend)}
+
+_instances = {}
+
+
+def get_backend(name=None):
+    """Return the named parser backend, or the configured default"""
+    if isinstance(name, ParserBackend):
+        return name
+    name = name or PARSER_BACKEND
+    if name not in _instances:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown parser backend '{name}', choose from {', '.join(BACKENDS)}")
+        _instances[name] = BACKENDS[name]()
+    return _instances[name]
+
+
+def available_backends():
+    """Names of the backends whose dependencies are installed"""
+    names = []
+    for name in BACKENDS:
+        try:
+            get_backend(name)
+            names.append(name)
+        except ImportError:
+            continue
+    return names
+
+
+def check_parity(fixtures=FIXTURES):
+    """
+    Run every available backend over the saved pages and compare its output
+    with the BeautifulSoup backend. Returns the number of mismatches, counting
+    an empty result where EXPECTED_CONTENT requires one as a mismatch too, and
+    one more if fewer than two backends are installed to compare.
+    """
+    from amazon_parser import parse_product_cards_css
+    from review_extractor import parse_page_snapshot
+
+    mismatches = 0
+    backends = available_backends()
+    missing = [name for name in BACKENDS if name not in backends]
+    if len(backends) < 2:
+        # bs4 compared only with itself would report no mismatches
+        mismatches += 1
+        print(f"FAIL only {', '.join(backends)} available; install the packages for {', '.join(missing)}")
+    elif missing:
+        print(f"skip backends {', '.join(missing)}: not installed")
+
+    for path in fixtures:
+        if not os.path.exists(path):
+            print(f"skip {path}: not found")
+            continue
+        with open(path, encoding='utf-8') as f:
+            page_html = f.read()
+
+        def extract(backend):
+            return {
+                'flipkart': parse_page_snapshot(page_html, 'flipkart', backend=backend),
+                'amazon': parse_page_snapshot(page_html, 'amazon', backend=backend),
+                'amazon_cards': parse_product_cards_css(page_html, limit=None, backend=backend),
+            }
+
+        expected = extract('bs4')
+        for name in backends:
+            actual = expected if name == 'bs4' else extract(name)
+            for key in EXPECTED_CONTENT.get(os.path.basename(path), []):
+                found = actual[key]['reviews'] if key in ('flipkart', 'amazon') else actual[key]
+                if not found:
+                    mismatches += 1
+                    print(f"EMPTY {path} [{name}] {key}: nothing extracted")
+            if name == 'bs4':
+                continue
+            for key in expected:
+                if actual[key] != expected[key]:
+                    mismatches += 1
+                    print(f"MISMATCH {path} [{name}] {key}:\n  bs4: {expected[key]}\n  {name}: {actual[key]}")
+            print(f"checked {path} with {name}")
+
+    print(f"{mismatches} mismatches across {', '.join(backends)}")
+    return mismatches
+
+
+if __name__ == "__main__":
+    sys.exit(1 if check_parity(sys.argv[1:] or FIXTURES) else 0)
@@ -0,0 +1,87 @@
+import re
+import sys
+
+import numpy as np
+
+# One token per number in a price string. Groups:
+#   mrp - the number is labelled as MRP (list price, not what you pay)
+#   cur - the number carries a currency marker
+#   num - the number itself, Indian (1,29,999) or western (129,999) grouping
+# Numbers followed by '%' are discounts and never match; the number must end
+# where its digits do, so the decimal part cannot be dropped to dodge the '%'.
+PRICE_TOKEN = re.compile(
+    r'(?P<mrp>M\.?R\.?P\.?[^\d₹]{0,12})?'
+    r'(?P<cur>₹|Rs\.?|INR)?\s*'
+    r'(?P<num>(?:\d{1,3}(?:,\d{2,3})+|\d+(?![\d,]))(?:\.\d+)?)'
+    r'(?!\.?\d)(?!\s*%)',
+    re.IGNORECASE
+)
+
+
+def normalize_price(text):
+    """
+    Return the selling price in a price string as a float, or infinity
+
+    Handles ₹/Rs prefixes, comma grouping, paise, ranges and "from" prices
+    (the lower, first-listed bound wins) and strings that show both MRP and
+    selling price (MRP is only used when nothing else is present).
+    """
+    if isinstance(text, (int, float)):
+        return float(text)
+    if not text:
+        return float('inf')
+
+    first_plain = None
+    first_mrp = None
+    for match in PRICE_TOKEN.finditer(text):
+        value = match.group('num').replace(',', '')
+        if match.group('mrp'):
+            if first_mrp is None:
+                first_mrp = value
+        elif match.group('cur'):
+            return float(value)
+        elif first_plain is None:
+            first_plain = value
+
+    value = first_plain if first_plain is not None else first_mrp
+    return float(value) if value is not None else float('inf')
+
+
+def normalize_prices(texts):
+    """Normalize a batch of price strings into a float array; unparseable entries become infinity"""
+    return np.fromiter((normalize_price(text) for text in texts), dtype=float, count=len(texts))
+
+
+def format_price(value):
+    """Display form used across the app, e.g. ₹1,299.50"""
+    return f"₹{value:,.2f}"
+
+
+if __name__ == "__main__":
+    # Self-checks against price strings seen on Flipkart and Amazon listings
+    cases = {
+        '₹1,29,999': 129999.0,
+        'Rs. 499.': 499.0,
+        '₹1,299.50': 1299.5,
+        'M.R.P.: ₹1,999 ₹1,499': 1499.0,
+        'M.R.P. 1,999': 1999.0,
+        '₹999 - ₹1,299': 999.0,
+        'From ₹12,999': 12999.0,
+        '40% off 1,499': 1499.0,
+        '12.5% off 499': 499.0,
+        '12.55 % off ₹2,499': 2499.0,
+        '': float('inf'),
+        'Currently unavailable': float('inf'),
+    }
+    failures = 0
+    for text, expected in cases.items():
+        value = normalize_price(text)
+        if value != expected:
+            failures += 1
+            print(f"FAIL {text!r}: {value} != {expected}")
+    batch = normalize_prices(list(cases))
+    if batch.dtype != float or list(batch) != list(cases.values()):
+        failures += 1
+        print(f"FAIL normalize_prices: {batch}")
+    print(f"{len(cases) - failures}/{len(cases)} price checks passed")
+    sys.exit(1 if failures else 0)
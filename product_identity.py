@@ -0,0 +1,148 @@
+import re
+import sys
+from collections import OrderedDict
+from urllib.parse import parse_qsl, unquote, urlencode, urlsplit, urlunsplit
+
+AMAZON_HOME = 'https://www.amazon.in'
+FLIPKART_HOME = 'https://www.flipkart.com'
+
+# ASINs appear after /dp/, /gp/product/, /gp/aw/d/ or /product-reviews/.
+# Sponsored links carry the target URL percent-encoded in a query parameter,
+# so the pattern is also tried on the unquoted URL.
+ASIN_PATTERN = re.compile(r'/(?:dp|gp/product|gp/aw/d|product-reviews)/([A-Z0-9]{10})(?=[/?&#]|$)')
+
+# Flipkart item IDs name the listing, the pid query parameter the variant
+FLIPKART_ITEM_PATTERN = re.compile(r'/(?:p|product-reviews)/(itm[0-9a-z]+)', re.IGNORECASE)
+FLIPKART_PID_PATTERN = re.compile(r'[?&]pid=([A-Z0-9]+)', re.IGNORECASE)
+
+# Query parameters that only track how the link was reached
+TRACKING_PARAMS = {
+    'ref', 'ref_', 'crid', 'sprefix', 'qid', 'sr', 'keywords', 'dib', 'dib_tag', 'th', 'psc',
+    'pd_rd_i', 'pd_rd_r', 'pd_rd_w', 'pd_rd_wg', 'pf_rd_p', 'pf_rd_r', 'content-id', 'spla',
+    'lid', 'marketplace', 'store', 'srno', 'otracker', 'otracker1', 'fm', 'iid', 'ppt', 'ppn',
+    'ssid', 'qh', 'requestid', 'cmpid', 'affid', 'affextparam1', 'affextparam2',
+}
+TRACKING_PREFIXES = ('utm_', 'pf_rd_', 'pd_rd_')
+
+# Amazon appends '/ref=...' as a path segment as well as a parameter
+REF_SEGMENT = re.compile(r'/ref=[^/?#]*')
+
+
+def extract_asin(url):
+    """The 10-character Amazon ASIN in a product, review or sponsored link, or None"""
+    if not url:
+        return None
+    for candidate in (url, unquote(url)):
+        match = ASIN_PATTERN.search(candidate)
+        if match:
+            return match.group(1)
+    return None
+
+
+def extract_flipkart_id(url):
+    """(item_id, pid) from a Flipkart product or review link; either may be None"""
+    if not url:
+        return None, None
+    item = FLIPKART_ITEM_PATTERN.search(url)
+    pid = FLIPKART_PID_PATTERN.search(url)
+    return (item.group(1).lower() if item else None), (pid.group(1).upper() if pid else None)
+
+
+def canonical_url(url):
+    """
+    The URL with tracking parameters, '/ref=' segments and fragments removed
+
+    Amazon products collapse to /dp/<ASIN> and Flipkart products keep only
+    their item path and pid, so every link to a product prints the same way.
+    """
+    if not url:
+        return url
+
+    asin = extract_asin(url)
+    if asin:
+        return f"{AMAZON_HOME}/dp/{asin}"
+
+    parts = urlsplit(url)
+    netloc = parts.netloc.lower()
+    path = REF_SEGMENT.sub('', parts.path).rstrip('/') or '/'
+
+    item_id, pid = extract_flipkart_id(url)
+    if item_id and 'flipkart' in netloc:
+        query = f"pid={pid}" if pid else ''
+        return urlunsplit((parts.scheme or 'https', netloc, path, query, ''))
+
+    params = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=False)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((parts.scheme or 'https', netloc, path, urlencode(params), ''))
+
+
+def product_key(url):
+    """
+    Stable identity for a product link, for caches, dedupe sets and history
+
+    'amazon:<ASIN>' or 'flipkart:<item_id>[:<pid>]' when the IDs can be read
+    from the link, the canonical URL otherwise.
+    """
+    asin = extract_asin(url)
+    if asin:
+        return f"amazon:{asin}"
+
+    item_id, pid = extract_flipkart_id(url)
+    if item_id:
+        return f"flipkart:{item_id}:{pid}" if pid else f"flipkart:{item_id}"
+
+    return canonical_url(url)
+
+
+def search_key(platform, search_term, page=1):
+    """Cache key for a search, ignoring case and spacing in the search term"""
+    return f"{platform}:search:{' '.join(search_term.lower().split())}:{page}"
+
+
+def measure_hit_rates(urls, capacity=64):
+    """
+    Replay urls through an LRU cache keyed on the raw URL and one keyed on
+    product_key, and return both hit rates
+    """
+    rates = {}
+    for name, key_fn in (('raw url', lambda url: url), ('product key', product_key)):
+        cache = OrderedDict()
+        hits = 0
+        for url in urls:
+            key = key_fn(url)
+            if key in cache:
+                hits += 1
+                cache.move_to_end(key)
+            else:
+                cache[key] = True
+                if len(cache) > capacity:
+                    cache.popitem(last=False)
+        rates[name] = hits / len(urls) if urls else 0.0
+    return rates
+
+
+if __name__ == "__main__":
+    # Product links from saved pages, e.g. python product_identity.py page_source.html
+    from html import unescape
+
+    paths = sys.argv[1:] or ['page_source.html', 'flipkart_debug.html']
+    urls = []
+    for path in paths:
+        try:
+            with open(path, encoding='utf-8') as f:
+                page_html = f.read()
+        except OSError as e:
+            print(f"skip {path}: {e}")
+            continue
+        for href in re.findall(r'href="([^"]+)"', page_html):
+            href = unescape(href)
+            if extract_asin(href) or extract_flipkart_id(href)[0]:
+                home = AMAZON_HOME if extract_asin(href) else FLIPKART_HOME
+                urls.append(href if href.startswith('http') else home + href)
+
+    print(f"{len(urls)} product links, {len(set(urls))} distinct URLs, "
+          f"{len(set(map(product_key, urls)))} distinct products")
+    for name, rate in measure_hit_rates(urls).items():
+        print(f"{name:>12}: {rate*100:.1f}% cache hit rate")
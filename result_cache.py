@@ -0,0 +1,223 @@
+import logging
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Kinds of cached result
+SEARCH = 'search'
+REVIEWS = 'reviews'
+
+# Seconds a result is reused for, by kind: prices move faster than review sentiment
+TTLS = {SEARCH: 15 * 60, REVIEWS: 6 * 60 * 60}
+
+# Memory cap over all entries, measured as their pickled size
+MAX_BYTES = 64 * 1024 * 1024
+
+
+def describe_age(seconds):
+    """Short human form of an entry's age, e.g. '45 s' or '12 min'"""
+    if seconds < 60:
+        return f"{seconds:.0f} s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    return f"{seconds / 3600:.1f} h"
+
+
+class _Flight:
+    """One in-progress computation of an entry and the requests waiting on it"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.waiters = 0
+        # (value, computed at) once the computation has finished
+        self.result = None
+
+
+class ResultCache:
+    """
+    Process-wide cache of search results and review analyses
+
+    st.session_state is per browser session, so without this every user, and
+    every reload of the page, repeats the whole scrape. Entries are keyed by
+    (kind, key), where key is built from product_identity's search_key or
+    product_key plus the settings that change the result (for reviews, the
+    sentiment model version too). They expire after
+    their kind's TTL and the least recently used are evicted once the pickled
+    size of all entries passes max_bytes.
+
+    Cached values are shared between sessions and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES, ttls=None):
+        self.max_bytes = max_bytes
+        self.ttls = dict(TTLS, **(ttls or {}))
+        # (kind, key) -> (value, stored, expires, size), least recently used first
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # (kind, key) -> _Flight, so concurrent requests for one key scrape it once
+        self._pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, entry_key):
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                return None, None
+            value, stored, expires, size = entry
+            now = time.time()
+            if now >= expires:
+                del self._entries[entry_key]
+                self._bytes -= size
+                return None, None
+            self._entries.move_to_end(entry_key)
+            return value, now - stored
+
+    def get(self, kind, key):
+        """(value, age in seconds) for a fresh entry, (None, None) if missing or expired"""
+        value, age = self._lookup((kind, key))
+        with self._lock:
+            if age is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value, age
+
+    def put(self, kind, key, value, ttl=None):
+        """Store value for ttl seconds (the kind's TTL by default), evicting old entries past max_bytes"""
+        try:
+            size = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except Exception as e:
+            logger.warning(f"Not caching {kind} result for {key}: {e}")
+            return False
+        if size > self.max_bytes:
+            logger.warning(f"Not caching {kind} result for {key}: {size} bytes is over the cache limit")
+            return False
+
+        now = time.time()
+        entry_key = (kind, key)
+        with self._lock:
+            old = self._entries.pop(entry_key, None)
+            if old is not None:
+                self._bytes -= old[3]
+            self._entries[entry_key] = (value, now, now + (ttl or self.ttls[kind]), size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+        return True
+
+    def fetch(self, kind, key, compute, refresh=False, keep=bool, ttl=None):
+        """
+        Cached value for key, or compute() stored in its place
+
+        Args:
+            kind: SEARCH or REVIEWS
+            key: Hashable key of the query or product
+            compute: Callable producing the value on a miss
+            refresh: Ignore any cached value, compute and replace it
+            keep: Predicate for values worth caching; by default empty
+                  results (often a blocked or failed scrape) are not
+            ttl: Seconds to keep the value, instead of the kind's TTL
+
+        Returns:
+            (value, age) where age is None if the value was just computed.
+            Exceptions from compute propagate and nothing is cached.
+        """
+        entry_key = (kind, key)
+        if not refresh:
+            value, age = self.get(kind, key)
+            if age is not None:
+                return value, age
+
+        with self._lock:
+            flight = self._pending.get(entry_key)
+            if flight is None:
+                flight = self._pending[entry_key] = _Flight()
+            flight.waiters += 1
+        try:
+            with flight.lock:
+                # Requests that waited on another's computation share its
+                # result, even one not worth caching
+                if flight.result is not None:
+                    value, computed = flight.result
+                    return value, time.time() - computed
+                if not refresh:
+                    value, age = self._lookup(entry_key)
+                    if age is not None:
+                        return value, age
+                start = time.perf_counter()
+                value = compute()
+                logger.info(f"Computed {kind} result for {key} in {time.perf_counter() - start:.1f}s")
+                if keep(value):
+                    self.put(kind, key, value, ttl)
+                flight.result = (value, time.time())
+                return value, None
+        finally:
+            # Dropped only once every request that joined has read the result
+            with self._lock:
+                flight.waiters -= 1
+                if not flight.waiters:
+                    self._pending.pop(entry_key, None)
+
+    def invalidate(self, kind=None, key=None):
+        """Drop the entry for key, every entry of kind, or everything; returns the number dropped"""
+        with self._lock:
+            doomed = [entry_key for entry_key in self._entries
+                      if (kind is None or entry_key[0] == kind) and (key is None or entry_key[1] == key)]
+            for entry_key in doomed:
+                self._bytes -= self._entries.pop(entry_key)[3]
+        if doomed:
+            logger.info(f"Dropped {len(doomed)} cached results")
+        return len(doomed)
+
+    def stats(self):
+        """Entry count, pickled bytes, hits, misses and evictions so far"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# Shared by every Streamlit session in the process
+result_cache = ResultCache()
+
+
+if __name__ == "__main__":
+    # Simulated slow searches from several sessions through a small cache
+    from concurrent.futures import ThreadPoolExecutor
+    from product_identity import search_key
+
+    delay = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+    cache = ResultCache(max_bytes=200 * 1024)
+    computed = []
+
+    def search(term):
+        computed.append(term)
+        time.sleep(delay)
+        return [{'title': f"{term} {i}", 'price': 100.0 + i, 'link': f"https://example.com/{i}"} for i in range(40)]
+
+    # Eight sessions, three queries that differ only in case and spacing
+    terms = ['iPhone 15', 'iphone  15', 'Pixel 8', 'pixel 8', 'IPHONE 15', 'Galaxy S24', 'galaxy s24', 'pixel 8 ']
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(terms)) as executor:
+        list(executor.map(lambda term: cache.fetch(SEARCH, search_key('flipkart', term),
+                                                   lambda: search(term)), terms))
+    print(f"{len(terms)} concurrent searches: {len(computed)} scraped in {time.perf_counter() - start:.2f}s")
+
+    # Enough further queries to overflow the cap and evict the oldest
+    listing = search('product')
+    for i in range(100):
+        cache.fetch(SEARCH, search_key('flipkart', f"product {i}"), lambda: listing)
+    print(f"after 100 more: {cache.stats()}")
@@ -0,0 +1,151 @@
+import sys
+import time
+import numpy as np
+from review_text import current, normalize_review, token_table
+
+# Reviews whose 64-bit SimHashes differ in at most this many bits are duplicates
+MAX_DISTANCE = 3
+# Four 16-bit bands: by pigeonhole, hashes within MAX_DISTANCE share a band
+BANDS = 4
+BAND_BITS = 64 // BANDS
+
+# Noise the DOM fallbacks capture around the same review text, as token ids:
+# a trailing READ MORE and a leading star rating ("5", "4.5 stars", "4 out of 5 stars")
+EXCLAMATION = token_table.intern('!')
+READ_MORE = [token_table.intern('read'), token_table.intern('more')]
+RATING_DIGITS = {token_table.intern(digit) for digit in '12345'}
+DECIMAL_DIGITS = {token_table.intern(digit) for digit in '0123456789'}
+STAR_WORDS = {token_table.intern('star'), token_table.intern('stars')}
+OUT_OF_5_STARS = [token_table.intern(word) for word in ('out', 'of', '5', 'stars')]
+token_table.pin()
+
+
+def content_ids(review):
+    """Token ids of a NormalizedReview without "!", a leading star rating or a trailing READ MORE"""
+    ids = [token_id for token_id in review.token_ids if token_id != EXCLAMATION]
+    if ids[-2:] == READ_MORE:
+        del ids[-2:]
+    if ids and ids[0] in RATING_DIGITS:
+        del ids[0]
+        if len(ids) > 1 and ids[0] in DECIMAL_DIGITS and (ids[1] in STAR_WORDS or ids[1:5] == OUT_OF_5_STARS):
+            del ids[0]
+        if ids[:4] == OUT_OF_5_STARS:
+            del ids[:4]
+        elif ids[:1] and ids[0] in STAR_WORDS:
+            del ids[0]
+    return ids
+
+
+def _mix64(values):
+    """splitmix64 finalizer: spreads small integer features over all 64 bits"""
+    values = values + np.uint64(0x9E3779B97F4A7C15)
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def simhash(ids):
+    """64-bit SimHash over token-id pairs (single tokens for one-word reviews)"""
+    ids = np.asarray(ids, dtype=np.uint64)
+    if len(ids) > 1:
+        features = (ids[:-1] << np.uint64(32)) | ids[1:]
+    else:
+        features = ids if len(ids) else np.zeros(1, dtype=np.uint64)
+    bits = np.unpackbits(_mix64(features).view(np.uint8)).reshape(len(features), 64)
+    votes = bits.sum(axis=0) * 2 > len(features)
+    return int(np.packbits(votes).view('>u8')[0])
+
+
+class NearDuplicateFilter:
+    """
+    Incremental, order-preserving near-duplicate filter
+
+    Each review's shared NormalizedReview token ids are SimHashed and checked
+    only against earlier reviews sharing one of its hash bands, so a batch of
+    n reviews costs O(n). Fingerprints use process-local token ids, so they
+    are only comparable within one token_table generation; when the table is
+    reset the kept reviews are fingerprinted again under the new ids.
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.exact = set()
+        self.buckets = [{} for _ in range(BANDS)]
+        self.kept = []
+        self.generation = token_table.generation
+        self.dropped = 0
+
+    def _bands(self, fingerprint):
+        mask = (1 << BAND_BITS) - 1
+        return [(fingerprint >> (band * BAND_BITS)) & mask for band in range(BANDS)]
+
+    def _keep(self, key, fingerprint):
+        self.exact.add(key)
+        for bucket, band in zip(self.buckets, self._bands(fingerprint)):
+            bucket.setdefault(band, []).append(fingerprint)
+
+    def _refingerprint(self):
+        """Rebuild the exact keys and bands of the kept reviews in the current generation"""
+        self.generation = token_table.generation
+        self.exact = set()
+        self.buckets = [{} for _ in range(BANDS)]
+        for text in self.kept:
+            ids = content_ids(normalize_review(text))
+            self._keep(tuple(ids), simhash(ids))
+
+    def add(self, text):
+        """True if text is new, False if it repeats or nearly repeats an earlier review"""
+        review = normalize_review(text)
+        # Normalizing, here or while rebuilding, can itself reset the table
+        while self.generation != token_table.generation or review.generation != token_table.generation:
+            self._refingerprint()
+            review = current(review)
+
+        ids = content_ids(review)
+        key = tuple(ids)
+        if key in self.exact:
+            self.dropped += 1
+            return False
+
+        fingerprint = simhash(ids)
+        for bucket, band in zip(self.buckets, self._bands(fingerprint)):
+            for other in bucket.get(band, ()):
+                if bin(fingerprint ^ other).count('1') <= self.max_distance:
+                    self.dropped += 1
+                    return False
+
+        self._keep(key, fingerprint)
+        self.kept.append(text)
+        return True
+
+    def unique(self, texts):
+        """texts without (near-)duplicates of each other or of anything added before, in order"""
+        return [text for text in texts if self.add(text)]
+
+
+def dedupe_reviews(texts, max_distance=MAX_DISTANCE):
+    """Order-preserving replacement for list(set(texts)) that also drops near-duplicates"""
+    return NearDuplicateFilter(max_distance).unique(texts)
+
+
+if __name__ == "__main__":
+    from review_extractor import parse_page_snapshot
+
+    path = sys.argv[1] if len(sys.argv) > 1 else 'page_source.html'
+    with open(path, encoding='utf-8') as f:
+        records = parse_page_snapshot(f.read(), 'flipkart')['reviews']
+    bodies = [record['body'] for record in records if record['body']]
+
+    # The same reviews as the fallback scans tend to capture them again
+    noisy = bodies + [f"{body} READ MORE" for body in bodies] + [f"5★ {body}" for body in bodies]
+    print(f"{len(noisy)} captured texts: {len(set(noisy))} after set(), "
+          f"{len(dedupe_reviews(noisy))} after near-duplicate filtering")
+
+    # Distinct synthetic reviews drawn from the page's vocabulary
+    rng = np.random.default_rng(0)
+    vocabulary = sorted({token for body in bodies for token in normalize_review(body).tokens if token != '!'})
+    for size in (1000, 10000, 50000):
+        corpus = [' '.join(rng.choice(vocabulary, 15)) for _ in range(size)]
+        start = time.perf_counter()
+        kept = dedupe_reviews(corpus)
+        print(f"{size:>6} reviews: {time.perf_counter() - start:.2f}s, {len(kept)} kept")
@@ -0,0 +1,225 @@
+import json
+import logging
+import re
+import time
+from page_state import extract_state_reviews, record_source, timed_state_extract
+from parser_backends import get_backend
+
+logger = logging.getLogger(__name__)
+
+# Selector fallbacks per platform. Every list is tried in order inside the
+# browser, so a miss costs nothing more than a querySelector call.
+REVIEW_SELECTORS = {
+    'flipkart': {
+        'nodes': [
+            'div.EPCmJX',
+            'div._27M-vq',
+            'div.col._2wzgFH',
+        ],
+        'title': ['p.z9E0IG', 'p._2-N8zT', 'p._2xg6Ul'],
+        'body': ['div.ZmyHeo', 'div.t-ZTKy', 'div._6K-7Co'],
+        'rating': ['div.XQDdHH', 'div._3LWZlK'],
+        'date': ['div.gHqwa8 p._2NsDsF:last-of-type', 'p._2sc7ZR:last-of-type'],
+    },
+    'amazon': {
+        'nodes': [
+            'div[data-hook="review"]',
+            'li[data-hook="review"]',
+            'div.review',
+        ],
+        'title': ['a[data-hook="review-title"]', 'span[data-hook="review-title"]', '.review-title'],
+        'body': ['span[data-hook="review-body"]', '.review-text-content', '.review-text'],
+        'rating': [
+            'i[data-hook="review-star-rating"] .a-icon-alt',
+            'i[data-hook="cmps-review-star-rating"] .a-icon-alt',
+            'i.review-rating',
+        ],
+        'date': ['span[data-hook="review-date"]', '.review-date'],
+    },
+}
+
+# Product name and price as shown on product and review pages
+PRODUCT_SELECTORS = {
+    'flipkart': {
+        'name': ['span.VU-ZEz', 'span.B_NuCI', 'h1.yhB1nd', 'a.wjcEIp'],
+        'price': ['div.Nx9bqj', 'div._30jeq3'],
+    },
+    'amazon': {
+        'name': ['#productTitle', 'a[data-hook="product-link"]'],
+        'price': ['span.a-price span.a-offscreen', 'span.a-color-price'],
+    },
+}
+
+READ_MORE = re.compile(r'\s*READ MORE\s*$')
+
+# Runs once per page. Finds every review node and reads all fields in the
+# browser, reads the product name and price, and also returns the text of the
+# inline scripts that can carry page state (see page_state.STATE_MARKERS), as
+# one JSON string, so the whole page costs one round-trip and page_source is
+# never transferred.
+REVIEW_EXTRACTION_JS = """
+var config = arguments[0];
+var productConfig = arguments[1];
+
+var state = [];
+var scripts = document.querySelectorAll('script');
+for (var s = 0; s < scripts.length; s++) {
+    var source = scripts[s].textContent || '';
+    if (scripts[s].type === 'application/ld+json') {
+        state.push('<script type="application/ld+json">' + source + '</script>');
+    } else if (source.indexOf('window.__INITIAL_STATE__') !== -1) {
+        state.push(source);
+    }
+}
+
+function firstText(root, selectors) {
+    for (var i = 0; i < selectors.length; i++) {
+        var el = root.querySelector(selectors[i]);
+        if (el) {
+            var text = (el.innerText || el.textContent || '').trim();
+            if (text) {
+                return text.replace(/\\s*READ MORE\\s*$/, '');
+            }
+        }
+    }
+    return '';
+}
+
+var nodes = [];
+for (var i = 0; i < config.nodes.length; i++) {
+    nodes = document.querySelectorAll(config.nodes[i]);
+    if (nodes.length) {
+        break;
+    }
+}
+
+var records = [];
+for (var j = 0; j < nodes.length; j++) {
+    var node = nodes[j];
+    var ratingText = firstText(node, config.rating);
+    var ratingMatch = ratingText.match(/\\d+(\\.\\d+)?/);
+    var idNode = node.querySelector('[id^="review-"]');
+    records.push({
+        id: node.id || (idNode ? idNode.id.replace(/^review-/, '') : ''),
+        title: firstText(node, config.title),
+        body: firstText(node, config.body),
+        rating: ratingMatch ? parseFloat(ratingMatch[0]) : null,
+        date: firstText(node, config.date)
+    });
+}
+var product = {};
+for (var field in productConfig) {
+    for (var k = 0; k < productConfig[field].length; k++) {
+        var el = document.querySelector(productConfig[field][k]);
+        // Truncated link text carries the full name in its title attribute
+        var value = el ? (el.getAttribute('title') || (el.innerText || el.textContent || '').trim()) : '';
+        if (value) {
+            product[field] = value;
+            break;
+        }
+    }
+}
+
+return JSON.stringify({state: state, records: records, product: product});
+"""
+
+
+def _run_extraction(driver, platform):
+    """(page state script text, DOM review records, product fields) from one execute_script call"""
+    try:
+        payload = json.loads(driver.execute_script(
+            REVIEW_EXTRACTION_JS, REVIEW_SELECTORS[platform], PRODUCT_SELECTORS[platform]
+        ) or '{}')
+    except Exception as e:
+        logger.debug(f"Bulk review extraction failed: {e}")
+        return '', [], {}
+    return '\n'.join(payload.get('state', [])), payload.get('records', []), payload.get('product', {})
+
+
+def _first_text(backend, root, selectors):
+    for selector in selectors:
+        elem = backend.select_one(root, selector)
+        if elem is not None:
+            # Truncated link text carries the full name in its title attribute
+            text = backend.attr(elem, 'title') or backend.text(elem)
+            if text:
+                return READ_MORE.sub('', text)
+    return ''
+
+
+def parse_review_records(document, platform, backend=None):
+    """Same extraction as REVIEW_EXTRACTION_JS, run locally on a parsed page snapshot"""
+    backend = get_backend(backend)
+    config = REVIEW_SELECTORS[platform]
+
+    nodes = []
+    for selector in config['nodes']:
+        nodes = backend.select(document, selector)
+        if nodes:
+            break
+
+    records = []
+    for node in nodes:
+        rating_match = re.search(r'\d+(?:\.\d+)?', _first_text(backend, node, config['rating']))
+        id_node = backend.select_one(node, '[id^="review-"]')
+        records.append({
+            'id': backend.attr(node, 'id') or (backend.attr(id_node, 'id')[len('review-'):] if id_node is not None else ''),
+            'title': _first_text(backend, node, config['title']),
+            'body': _first_text(backend, node, config['body']),
+            'rating': float(rating_match.group()) if rating_match else None,
+            'date': _first_text(backend, node, config['date']),
+        })
+    return records
+
+
+def parse_page_snapshot(page_html, platform, backend=None):
+    """
+    Everything needed from a review page, taken from one page_source snapshot
+
+    Returns a dict with 'reviews' (dicts with id, title, body, rating and date
+    keys, read from embedded page state first and the DOM second) and 'product'
+    (name and price text where shown), as extract_page_data does in the browser.
+    """
+    backend = get_backend(backend)
+    document = backend.parse(page_html)
+
+    records = timed_state_extract(extract_state_reviews, page_html, platform)
+    if not records:
+        start = time.perf_counter()
+        records = parse_review_records(document, platform, backend)
+        record_source(platform, 'dom', bool(records), time.perf_counter() - start)
+
+    product = {}
+    for field, selectors in PRODUCT_SELECTORS[platform].items():
+        value = _first_text(backend, document, selectors)
+        if value:
+            product[field] = value
+
+    backend.release(document)
+    return {'reviews': records, 'product': product}
+
+
+def extract_page_data(driver, platform):
+    """
+    Same result as parse_page_snapshot for the page the driver is on, with
+    reviews read from the embedded page state when the page ships one and
+    from the DOM otherwise. State, reviews and product fields all come back
+    from a single execute_script call.
+    """
+    start = time.perf_counter()
+    state_html, dom_records, product = _run_extraction(driver, platform)
+    elapsed = time.perf_counter() - start
+
+    records = timed_state_extract(extract_state_reviews, state_html, platform)
+    if records:
+        logger.info(f"Read {len(records)} {platform} reviews from embedded page state")
+    else:
+        logger.info(f"Bulk extracted {len(dom_records)} {platform} reviews in one call")
+        record_source(platform, 'dom', bool(dom_records), elapsed)
+        records = dom_records
+    return {'reviews': records, 'product': product}
+
+
+def extract_page_reviews(driver, platform):
+    """Reviews on the current page, as from extract_page_data"""
+    return extract_page_data(driver, platform)['reviews']
@@ -0,0 +1,240 @@
+import logging
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlencode, urlsplit
+
+from parser_backends import get_backend
+from product_identity import AMAZON_HOME, FLIPKART_HOME, extract_asin, extract_flipkart_id
+from review_dedupe import NearDuplicateFilter
+from review_extractor import parse_page_snapshot
+from sentiment import SentimentAggregator, score_reviews, threshold_verdict
+
+logger = logging.getLogger(__name__)
+
+# Review sort orders each site offers, the default first
+SORT_ORDERS = {
+    'flipkart': ['MOST_HELPFUL', 'MOST_RECENT', 'NEGATIVE_FIRST', 'POSITIVE_FIRST'],
+    'amazon': ['helpful', 'recent'],
+}
+
+# Star filters in review URLs; Flipkart has none, so its reviews are
+# sampled across sort orders and stratified by their own rating afterwards
+STAR_FILTERS = {
+    'flipkart': {},
+    'amazon': {5: 'five_star', 4: 'four_star', 3: 'three_star', 2: 'two_star', 1: 'one_star'},
+}
+
+# Review fields each platform's scrape path scores, with the length a text
+# must exceed: Flipkart scores bodies then titles, Amazon titles only
+SCORED_FIELDS = {
+    'flipkart': [('body', 10), ('title', 3)],
+    'amazon': [('title', 0)],
+}
+
+# Rating histogram on review pages
+FLIPKART_HISTOGRAM = 'div.BArk-j'  # review counts, 5 stars first
+AMAZON_HISTOGRAM = re.compile(r'(\d{1,3})\s*percent of reviews have ([1-5]) stars?', re.IGNORECASE)
+
+
+def review_page_url(platform, product_url, sort=None, stars=None, page=1):
+    """Review page URL for a product link with the given sort order, star filter and page, or None"""
+    if platform == 'flipkart':
+        item_id, pid = extract_flipkart_id(product_url)
+        if not item_id:
+            return None
+        path = urlsplit(product_url).path
+        path = path.replace('/p/', '/product-reviews/') if '/p/' in path else f"/product-reviews/{item_id}"
+        params = {'pid': pid, 'sortOrder': sort, 'certifiedBuyer': 'false', 'aid': 'overall', 'page': page}
+        base = f"{FLIPKART_HOME}{path}"
+    else:
+        asin = extract_asin(product_url)
+        if not asin:
+            return None
+        params = {'sortBy': sort, 'filterByStar': STAR_FILTERS['amazon'].get(stars),
+                  'reviewerType': 'all_reviews', 'pageNumber': page}
+        base = f"{AMAZON_HOME}/product-reviews/{asin}"
+    return f"{base}?{urlencode({key: value for key, value in params.items() if value})}"
+
+
+def review_texts(platform, records):
+    """Texts the platform's scrape path would score for records, in the same order"""
+    return [record[field] for field, min_length in SCORED_FIELDS[platform]
+            for record in records if record[field] and len(record[field]) > min_length]
+
+
+def scored_review_count(platform, records):
+    """How many records contribute at least one text to review_texts"""
+    return sum(1 for record in records
+               if any(record[field] and len(record[field]) > min_length
+                      for field, min_length in SCORED_FIELDS[platform]))
+
+
+def parse_star_histogram(page_html, platform):
+    """Share of ratings per star {5: 0.6, 4: 0.2, ...} from a review page, or {}"""
+    counts = {}
+    if platform == 'flipkart':
+        backend = get_backend()
+        document = backend.parse(page_html)
+        values = [backend.text(node).replace(',', '') for node in backend.select(document, FLIPKART_HISTOGRAM)]
+        backend.release(document)
+        if len(values) >= 5 and all(value.isdigit() for value in values[:5]):
+            counts = {5 - i: int(value) for i, value in enumerate(values[:5])}
+    else:
+        for percent, stars in AMAZON_HISTOGRAM.findall(page_html):
+            counts.setdefault(int(stars), int(percent))
+
+    # Levels shown as 0% carry no weight and are left out of the plan and reweighting
+    total = sum(counts.values())
+    return {stars: count / total for stars, count in counts.items() if count} if total else {}
+
+
+def plan_pages(platform, histogram, budget):
+    """
+    Pick budget review pages as {'sort', 'stars', 'page'} dicts
+
+    With star filters, pages are split across star levels in proportion to
+    the square root of each level's share (so rare ratings still get a page)
+    and rotate through sort orders within a level. Without them, pages rotate
+    through the sort orders.
+    """
+    orders = SORT_ORDERS[platform]
+    levels = [stars for stars in STAR_FILTERS[platform] if histogram.get(stars)]
+    if not levels:
+        return [{'sort': orders[i % len(orders)], 'stars': None, 'page': i // len(orders) + 1}
+                for i in range(budget)]
+
+    # Largest-remainder allocation, at least one page per level while budget lasts
+    roots = {stars: histogram[stars] ** 0.5 for stars in levels}
+    scale = budget / sum(roots.values())
+    pages = {stars: max(1, int(roots[stars] * scale)) for stars in levels}
+    by_remainder = sorted(levels, key=lambda stars: roots[stars] * scale - pages[stars], reverse=True)
+    while sum(pages.values()) < budget:
+        pages[by_remainder[0]] += 1
+        by_remainder = by_remainder[1:] + by_remainder[:1]
+    while sum(pages.values()) > budget:
+        pages[max(pages, key=pages.get)] -= 1
+
+    return [{'sort': orders[i % len(orders)], 'stars': stars, 'page': i // len(orders) + 1}
+            for stars in levels for i in range(pages[stars])]
+
+
+def stratified_sentiment(platform, records, histogram, verdict_rule=threshold_verdict):
+    """
+    Score sampled review records and reweight them to the product's rating mix
+
+    The same fields are scored as on the platform's scrape path (review_texts),
+    each carrying its review's star level. Each rated text is weighted by its
+    star level's share of all ratings over that level's share of the sample,
+    so over-sampled levels count less. With no histogram or no ratings every
+    text weighs 1.
+
+    Returns (scored rows with a 'weight' key, SentimentAggregator).
+    """
+    pairs = [(record[field], round(record['rating']) if record.get('rating') else None)
+             for field, min_length in SCORED_FIELDS[platform]
+             for record in records if record[field] and len(record[field]) > min_length]
+    rows = score_reviews([text for text, _ in pairs])
+
+    levels = [stars for _, stars in pairs]
+    sampled = {}
+    for stars in levels:
+        if histogram.get(stars):
+            sampled[stars] = sampled.get(stars, 0) + 1
+    covered = sum(histogram[stars] for stars in sampled)
+    rated = sum(sampled.values())
+
+    sentiment = SentimentAggregator(verdict_rule)
+    for row, stars in zip(rows, levels):
+        if stars in sampled:
+            row['weight'] = histogram[stars] / covered * rated / sampled[stars]
+        else:
+            row['weight'] = 1
+    sentiment.add(rows, scored_review_count(platform, records))
+    return rows, sentiment
+
+
+def sample_review_pages(platform, product_url, fetch, budget=6, workers=3, verdict_rule=threshold_verdict):
+    """
+    Fetch a stratified sample of review pages concurrently and estimate sentiment
+
+    Args:
+        platform: 'flipkart' or 'amazon'
+        product_url: Product (or review) link
+        fetch: Callable returning the page source for a URL; called from
+            worker threads, so each call should use its own browser
+        budget: Total number of review pages to fetch, including the first
+        workers: Pages fetched at the same time
+        verdict_rule: Rule for the reweighted SentimentAggregator
+
+    Returns:
+        Dict with 'records', 'scored', 'sentiment', 'histogram', 'plan' and
+        'product', or None if no review URL can be built for the link.
+    """
+    first_url = review_page_url(platform, product_url, SORT_ORDERS[platform][0])
+    if not first_url:
+        logger.warning(f"Could not build a {platform} review URL from {product_url}")
+        return None
+
+    def url_for(entry):
+        return review_page_url(platform, product_url, entry['sort'], entry['stars'], entry['page'])
+
+    # The default page gives the rating histogram the plan depends on
+    first_html = fetch(first_url)
+    first_snapshot = parse_page_snapshot(first_html, platform)
+    histogram = parse_star_histogram(first_html, platform)
+
+    # The first page counts against the budget whether or not the plan includes it
+    plan = [entry for entry in plan_pages(platform, histogram, budget) if url_for(entry) != first_url]
+    if len(plan) >= budget:
+        plan = plan_pages(platform, histogram, budget - 1)
+    logger.info(f"Sampling {len(plan) + 1} {platform} review pages, histogram {histogram}")
+
+    pages = [first_snapshot['reviews']]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(fetch, url_for(entry)): entry
+            for entry in plan
+        }
+        for future in as_completed(futures):
+            try:
+                pages.append(parse_page_snapshot(future.result(), platform)['reviews'])
+            except Exception as e:
+                logger.error(f"Error fetching review page {futures[future]}: {e}")
+
+    # Sort orders overlap, so the same review often comes back more than once
+    unique = NearDuplicateFilter()
+    records = [record for page_records in pages for record in page_records
+               if (record['body'] or record['title']) and unique.add(record['body'] or record['title'])]
+
+    scored, sentiment = stratified_sentiment(platform, records, histogram, verdict_rule)
+    logger.info(f"Sampled {len(records)} unique reviews: {sentiment.summary()}")
+    return {
+        'records': records,
+        'scored': scored,
+        'sentiment': sentiment,
+        'histogram': histogram,
+        'plan': plan,
+        'product': first_snapshot['product'],
+    }
+
+
+if __name__ == "__main__":
+    # Plan and reweighting for a saved review page, e.g. python review_sampling.py page_source.html 8
+    path = sys.argv[1] if len(sys.argv) > 1 else 'page_source.html'
+    budget = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    with open(path, encoding='utf-8') as f:
+        page_html = f.read()
+
+    histogram = parse_star_histogram(page_html, 'flipkart')
+    print(f"histogram: { {stars: round(share, 3) for stars, share in histogram.items()} }")
+    for platform in ('flipkart', 'amazon'):
+        print(f"{platform} plan for {budget} pages:")
+        for entry in plan_pages(platform, histogram, budget):
+            print(f"  {entry}")
+
+    records = parse_page_snapshot(page_html, 'flipkart')['reviews']
+    _, unweighted = stratified_sentiment('flipkart', records, {})
+    _, weighted = stratified_sentiment('flipkart', records, histogram)
+    print(f"unweighted: {unweighted.summary()}")
+    print(f"reweighted: {weighted.summary()}")
@@ -0,0 +1,350 @@
+import logging
+import sqlite3
+import sys
+import threading
+import time
+from product_identity import product_key
+from review_dedupe import NearDuplicateFilter
+from review_extractor import parse_page_snapshot
+from review_sampling import review_page_url, review_texts, scored_review_count
+from review_text import normalize_review
+from sentiment import SentimentAggregator, model_version, score_reviews, threshold_verdict
+
+logger = logging.getLogger(__name__)
+
+# Review sort order that lists the newest reviews first
+NEWEST_FIRST = {'flipkart': 'MOST_RECENT', 'amazon': 'recent'}
+
+
+def review_key(record):
+    """Stable identity of a review record: the site's review id, else the hash of its text"""
+    if record.get('id'):
+        return f"id:{record['id']}"
+    return normalize_review(record['body'] or record['title']).hash
+
+
+def store_key(product_url, backend=None):
+    """Key a product's corpus is stored under: its product_key and the sentiment model that scored it"""
+    return f"{product_key(product_url)}@{model_version(backend)}"
+
+
+class ReviewStore:
+    """
+    Per-product corpus of reviews seen so far, with its running sentiment
+
+    Reviews are keyed by review_key under the product's store_key, and the
+    product's SentimentAggregator state is stored next to them, so a refresh
+    only has to fetch, score and fold in reviews posted since the last sync.
+    store_key includes the sentiment model version, so switching backends
+    starts a separate corpus instead of mixing counts from both.
+
+    A sync that stops before the oldest review leaves a backfill page: the
+    newest-first page later syncs resume from once they have caught up, so
+    the store is not taken as complete. Keys of reviews dropped as near
+    duplicates are kept too, so later syncs recognise them as seen.
+    """
+
+    def __init__(self, path='review_store.db'):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            # Streamlit reruns the script on other threads; access is serialized by _lock
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS reviews (
+                    product TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    rating REAL,
+                    date TEXT NOT NULL,
+                    synced REAL NOT NULL,
+                    position INTEGER NOT NULL,
+                    PRIMARY KEY (product, key)
+                );
+                CREATE TABLE IF NOT EXISTS products (
+                    product TEXT PRIMARY KEY,
+                    positive REAL NOT NULL,
+                    neutral REAL NOT NULL,
+                    negative REAL NOT NULL,
+                    mean REAL NOT NULL,
+                    m2 REAL NOT NULL,
+                    synced REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS skipped (
+                    product TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    PRIMARY KEY (product, key)
+                );
+                CREATE TABLE IF NOT EXISTS backfill (
+                    product TEXT PRIMARY KEY,
+                    page INTEGER NOT NULL
+                );
+            """)
+        return self._conn
+
+    def seen(self, product):
+        """review_keys already stored or skipped as near duplicates for a product"""
+        try:
+            with self._lock:
+                rows = self._connect().execute(
+                    "SELECT key FROM reviews WHERE product = ? UNION SELECT key FROM skipped WHERE product = ?",
+                    (product, product)
+                )
+                return {row[0] for row in rows}
+        except sqlite3.Error as e:
+            logger.warning(f"Review store lookup failed: {e}")
+            return set()
+
+    def records(self, product):
+        """Stored review records for a product, newest first"""
+        try:
+            with self._lock:
+                rows = self._connect().execute(
+                    "SELECT key, title, body, rating, date FROM reviews WHERE product = ? "
+                    "ORDER BY synced DESC, position", (product,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read stored reviews: {e}")
+            return []
+        return [{'id': key[len('id:'):] if key.startswith('id:') else '', 'title': title, 'body': body,
+                 'rating': rating, 'date': date} for key, title, body, rating, date in rows]
+
+    def last_synced(self, product):
+        """Time of the product's last sync, or None if it was never synced"""
+        try:
+            with self._lock:
+                row = self._connect().execute("SELECT synced FROM products WHERE product = ?", (product,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Review store lookup failed: {e}")
+            return None
+        return row[0] if row else None
+
+    def backfill_page(self, product):
+        """Newest-first review page older reviews still have to be fetched from, or None if none are missing"""
+        try:
+            with self._lock:
+                row = self._connect().execute("SELECT page FROM backfill WHERE product = ?", (product,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Review store lookup failed: {e}")
+            return None
+        return row[0] if row else None
+
+    def sentiment(self, product, verdict_rule=threshold_verdict):
+        """SentimentAggregator over the product's stored reviews"""
+        try:
+            with self._lock:
+                row = self._connect().execute(
+                    "SELECT positive, neutral, negative, mean, m2, "
+                    "(SELECT COUNT(*) FROM reviews WHERE reviews.product = products.product) "
+                    "FROM products WHERE product = ?", (product,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read stored sentiment: {e}")
+            row = None
+        if not row:
+            return SentimentAggregator(verdict_rule)
+        state = dict(zip(('positive', 'neutral', 'negative', 'mean', 'm2', 'reviews'), row))
+        return SentimentAggregator.from_state(state, verdict_rule)
+
+    def save(self, product, new_records, sentiment, older_records=(), skipped_keys=(), backfill_page=None):
+        """
+        Add newly seen records (newest first) and replace the product's sentiment state
+
+        older_records are backfilled ones, older than everything stored, and
+        are ordered after it; skipped_keys are near duplicates left out;
+        backfill_page replaces the product's backfill page (None once complete).
+        """
+        now = time.time()
+        state = sentiment.state()
+        try:
+            with self._lock:
+                conn = self._connect()
+                rows = [(record, now, position) for position, record in enumerate(new_records)]
+                if older_records:
+                    # records() orders by synced, so backfilled reviews sort after the oldest stored ones
+                    oldest = conn.execute("SELECT MIN(synced) FROM reviews WHERE product = ?", (product,)).fetchone()[0]
+                    rows += [(record, (oldest or now) - 1, position) for position, record in enumerate(older_records)]
+                conn.executemany(
+                    "INSERT OR IGNORE INTO reviews VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(product, review_key(record), record['title'], record['body'], record.get('rating'),
+                      record.get('date') or '', synced, position)
+                     for record, synced, position in rows]
+                )
+                conn.executemany("INSERT OR IGNORE INTO skipped VALUES (?, ?)", [(product, key) for key in skipped_keys])
+                if backfill_page is None:
+                    conn.execute("DELETE FROM backfill WHERE product = ?", (product,))
+                else:
+                    conn.execute("INSERT OR REPLACE INTO backfill VALUES (?, ?)", (product, backfill_page))
+                conn.execute(
+                    "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (product, state['positive'], state['neutral'], state['negative'], state['mean'], state['m2'], now)
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Review store update failed: {e}")
+
+
+# Shared store used by the review scrapers
+review_store = ReviewStore()
+
+
+def sync_reviews(platform, product_url, fetch, max_pages=5, verdict_rule=threshold_verdict,
+                 on_page=None, store=review_store, early_stop=True):
+    """
+    Fetch only the reviews posted since the product was last synced
+
+    Pages are requested newest first and the new reviews end at the first
+    one already in the store, since everything after it is older. If an
+    earlier sync stopped before the oldest review (page budget or a settled
+    verdict), the remaining budget then resumes from its backfill page,
+    skipping reviews already stored. New reviews that nearly repeat a stored
+    or earlier new one are dropped, as in the full scrape; the rest are
+    scored and folded into the stored sentiment, and both are saved back.
+
+    Args:
+        platform: 'flipkart' or 'amazon'
+        product_url: Product (or review) link
+        fetch: Callable returning the page source for a URL
+        max_pages: Most pages to fetch, e.g. on the first sync
+        verdict_rule: Rule for the returned SentimentAggregator
+        on_page: Optional callback(page, sentiment) after each page
+        store: ReviewStore to read and update
+        early_stop: Stop paginating once the running verdict is settled
+            (see SentimentAggregator.settled); reviews not fetched then
+            could not change it
+
+    Returns:
+        Dict with 'new' (records added by this sync), 'records' (every stored
+        record, newest first), 'scored', 'sentiment', 'pages', 'caught_up'
+        (True if a known review was reached), 'backfill' (the page older
+        reviews resume from next time, None once the store reaches the
+        oldest review), 'early_stop' ({'reason', 'pages_scraped',
+        'pages_saved'} or None) and 'product', or None if no review URL can
+        be built for the link.
+    """
+    if not review_page_url(platform, product_url):
+        logger.warning(f"Could not build a {platform} review URL from {product_url}")
+        return None
+
+    product = store_key(product_url)
+    known = store.seen(product)
+    stored = store.records(product) if known else []
+    sentiment = store.sentiment(product, verdict_rule)
+    resume_from = store.backfill_page(product)
+    new_records, older_records = [], []
+    new_keys, skipped_keys = set(), set()
+    product_info = {}
+    caught_up = False
+    backfilling = False
+    finished = False
+    stop = None
+
+    unique = NearDuplicateFilter()
+    for record in stored:
+        unique.add(record['body'] or record['title'])
+
+    page = 0
+    number = 0
+    last_keys = None
+    while page < max_pages:
+        page += 1
+        number += 1
+        snapshot = parse_page_snapshot(fetch(review_page_url(platform, product_url, NEWEST_FIRST[platform], page=number)),
+                                       platform)
+        product_info = product_info or snapshot['product']
+        if not snapshot['reviews']:
+            finished = True
+            break
+
+        page_records = []
+        page_keys = []
+        unseen = 0
+        reached_known = False
+        for record in snapshot['reviews']:
+            key = review_key(record) if (record['body'] or record['title']) else None
+            page_keys.append(key)
+            if key in known:
+                if backfilling:
+                    continue
+                reached_known = True
+                break
+            if key and key not in new_keys:
+                new_keys.add(key)
+                unseen += 1
+                if unique.add(record['body'] or record['title']):
+                    page_records.append(record)
+                else:
+                    skipped_keys.add(key)
+
+        # Past the last page the site repeats the final one
+        if page_keys == last_keys or (not unseen and not reached_known and not backfilling):
+            finished = True
+            break
+        last_keys = page_keys
+        (older_records if backfilling else new_records).extend(page_records)
+        sentiment.add(score_reviews(review_texts(platform, page_records)), scored_review_count(platform, page_records))
+        logger.info(f"Sync page {number}{' (backfill)' if backfilling else ''}: {len(page_records)} new reviews, "
+                    f"{sentiment.summary()}")
+        if on_page:
+            on_page(page, sentiment)
+
+        if reached_known:
+            caught_up = True
+            if resume_from is None:
+                break
+            # Everything new is in; spend the rest of the budget on older reviews
+            backfilling = True
+            number = resume_from - 1
+            last_keys = None
+
+        # More pages cannot change a settled verdict
+        reason = sentiment.settled() if early_stop and page < max_pages else None
+        if reason:
+            stop = {'reason': reason, 'pages_scraped': page, 'pages_saved': max_pages - page}
+            logger.info(f"Stopping sync after page {number}: {reason}")
+            break
+
+    backfill = resume_from
+    if finished:
+        backfill = None
+    elif backfilling or not caught_up:
+        # Stopped early or out of budget: older (or, if not caught up, skipped newer) reviews remain from here
+        backfill = number + 1
+
+    if new_records or older_records or skipped_keys or not known or backfill != resume_from:
+        store.save(product, new_records, sentiment, older_records, skipped_keys, backfill)
+    records = new_records + stored + older_records
+    logger.info(f"Synced {product}: {len(new_records) + len(older_records)} new of {len(records)} reviews in "
+                f"{page} pages{', caught up' if caught_up else ''}"
+                f"{f', older reviews from page {backfill} still to fetch' if backfill else ''}")
+    return {
+        'new': new_records + older_records,
+        'records': records,
+        'scored': score_reviews(review_texts(platform, records)),
+        'sentiment': sentiment,
+        'pages': page,
+        'caught_up': caught_up,
+        'backfill': backfill,
+        'early_stop': stop,
+        'product': product_info,
+    }
+
+if __name__ == "__main__":
+    # Two syncs of a saved review page into a scratch store: the second finds nothing new
+    path = sys.argv[1] if len(sys.argv) > 1 else 'page_source.html'
+    with open(path, encoding='utf-8') as f:
+        page_html = f.read()
+    scratch = ReviewStore(':memory:')
+    link = 'https://www.flipkart.com/product/p/itm0000000000000?pid=SAVEDPAGE0000000'
+
+    for run in (1, 2):
+        fetched = []
+        result = sync_reviews('flipkart', link, lambda url: fetched.append(url) or page_html,
+                              max_pages=3, store=scratch)
+        print(f"sync {run}: {len(fetched)} pages fetched, {len(result['new'])} new, "
+              f"{len(result['records'])} stored, caught up: {result['caught_up']}")
+        print(f"  {result['sentiment'].summary()}")
@@ -0,0 +1,152 @@
+import hashlib
+import re
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from functools import lru_cache
+
+# Lowercased words (hyphenated ones kept whole), "n't" and "!" as separate tokens
+TOKEN_PATTERN = re.compile(r"n't|\w+(?:-\w+)*|!")
+
+# Distinct review texts whose normalized records are kept in memory: enough
+# for one analysis (pages, titles and a synced corpus) to share its records
+RECORD_CACHE_SIZE = 4096
+
+# Distinct tokens kept before the table is reset along with the record cache
+MAX_TOKENS = 200000
+
+
+class TokenTable:
+    """
+    Process-wide table of interned tokens
+
+    Every distinct token is stored once (as a sys.intern'd string) and given
+    a small integer id, so reviews carry compact arrays of ids instead of
+    lists of strings, and per-token data such as lexicon rows can be looked
+    up by id in flat arrays.
+
+    The table would otherwise grow for the life of the process, so past
+    MAX_TOKENS it is reset: every token after the pinned ones is dropped and
+    generation is bumped. Ids from an older generation must not be used.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.tokens = []
+        self.generation = 0
+        self.pinned = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def intern(self, token):
+        """Id of token, adding it on first sight"""
+        token_id = self.ids.get(token)
+        if token_id is None:
+            with self._lock:
+                token_id = self.ids.get(token)
+                if token_id is None:
+                    token = sys.intern(token)
+                    token_id = len(self.tokens)
+                    self.tokens.append(token)
+                    self.ids[token] = token_id
+        return token_id
+
+    def pin(self):
+        """Keep every token interned so far, and its id, across resets (for module-level constants)"""
+        with self._lock:
+            self.pinned = len(self.tokens)
+
+    def reset(self):
+        """Drop every unpinned token and start a new generation"""
+        with self._lock:
+            for token in self.tokens[self.pinned:]:
+                del self.ids[token]
+            del self.tokens[self.pinned:]
+            self.generation += 1
+
+
+# Shared by every NormalizedReview in the process
+token_table = TokenTable()
+
+
+class NormalizedReview:
+    """
+    A review's text, prepared once for every stage that needs it
+
+    clean is the text with Unicode form and whitespace normalized, which is
+    what gets scored and displayed (the same string as text when nothing
+    changed); hash identifies it in the sentiment cache and dedupe; token_ids
+    are its lowercased tokens as ids in token_table's generation.
+    """
+
+    __slots__ = ('text', 'clean', 'hash', 'token_ids', 'generation')
+
+    def __init__(self, text):
+        self.text = text
+        clean = ' '.join(unicodedata.normalize('NFC', text).split())
+        self.clean = text if clean == text else clean
+        self.hash = hashlib.sha1(self.clean.encode('utf-8')).hexdigest()
+        self.generation = token_table.generation
+        self.token_ids = array('I', map(token_table.intern, TOKEN_PATTERN.findall(self.clean.lower())))
+
+    @property
+    def length(self):
+        return len(self.clean)
+
+    @property
+    def tokens(self):
+        return [token_table.tokens[token_id] for token_id in self.token_ids]
+
+    def preview(self, limit=100):
+        """Clean text cut to limit characters for tables and logs"""
+        return self.clean[:limit] + "..." if len(self.clean) > limit else self.clean
+
+    def __repr__(self):
+        return f"NormalizedReview({self.preview(40)!r})"
+
+
+@lru_cache(maxsize=RECORD_CACHE_SIZE)
+def _cached_review(text):
+    return NormalizedReview(text)
+
+
+def normalize_review(text):
+    """Shared NormalizedReview for text; each distinct text is processed once while cached"""
+    if len(token_table) > MAX_TOKENS:
+        token_table.reset()
+        _cached_review.cache_clear()
+    review = _cached_review(text)
+    if review.generation != token_table.generation:
+        # Cached by another thread just before a reset
+        review = NormalizedReview(text)
+    return review
+
+
+def current(review):
+    """review itself, or a fresh NormalizedReview if its token ids predate a token_table reset"""
+    return review if review.generation == token_table.generation else normalize_review(review.text)
+
+
+if __name__ == "__main__":
+    from review_extractor import parse_page_snapshot
+
+    path = sys.argv[1] if len(sys.argv) > 1 else 'page_source.html'
+    with open(path, encoding='utf-8') as f:
+        records = parse_page_snapshot(f.read(), 'flipkart')['reviews']
+    texts = [text for record in records for text in (record['title'], record['body']) if text]
+
+    # Distinct reviews built from the page's words, as a larger batch would be
+    words = ' '.join(texts).split()
+    corpus = [' '.join(words[(i + j * 7) % len(words)] for j in range(40)) + f" ({i})" for i in range(20000)]
+    start = time.perf_counter()
+    reviews = [normalize_review(text) for text in corpus]
+    elapsed = time.perf_counter() - start
+    token_count = sum(len(review.token_ids) for review in reviews)
+    print(f"{len(corpus)} reviews, {token_count} tokens, {len(token_table)} distinct: "
+          f"{elapsed*1000:.0f} ms to normalize")
+    print(f"token ids: {sum(review.token_ids.itemsize * len(review.token_ids) for review in reviews) / 1e6:.1f} MB, "
+          f"as per-review strings: {sum(sys.getsizeof(token) for review in reviews for token in review.tokens) / 1e6:.1f} MB")
@@ -0,0 +1,194 @@
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+STATS_FILE = 'selector_stats.json'
+
+# A selector counts as dominant once it has matched this often and this reliably
+DOMINANT_MIN_HITS = 5
+DOMINANT_HIT_RATE = 0.8
+
+# Groups that record where data came from rather than a page selector; a miss
+# there (e.g. a product with no reviews) says nothing about the layout
+SOURCE_GROUPS = {'data_source'}
+
+
+def selector_key(selector):
+    """Stable string key for a CSS/XPath string, a (By, value) tuple or a compiled XPath"""
+    if isinstance(selector, str):
+        return selector
+    if isinstance(selector, tuple):
+        return ':'.join(str(part) for part in selector)
+    return getattr(selector, 'path', str(selector))
+
+
+class SelectorRegistry:
+    """
+    Records hit/miss counts and latency for every fallback selector, per
+    platform and selector group, and orders attempts so the selector that is
+    currently working is tried first. Selectors are only reordered within a
+    precision tier, so a generic fallback is never promoted over a specific
+    selector. Stats are persisted as JSON; the registry is shared by scraper
+    threads, so all access goes through a lock.
+    """
+
+    def __init__(self, path=STATS_FILE):
+        self.path = path
+        self.stats = {}
+        self.dirty = False
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.stats = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not load selector stats from {self.path}: {e}")
+            self.stats = {}
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            tmp_path = None
+            try:
+                # Write a temp file and swap it in, so readers never see a half-written file
+                fd, tmp_path = tempfile.mkstemp(prefix='.selector_stats-', suffix='.json',
+                                                dir=os.path.dirname(os.path.abspath(self.path)))
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(self.stats, f, indent=2)
+                os.replace(tmp_path, self.path)
+                self.dirty = False
+            except Exception as e:
+                logger.warning(f"Could not save selector stats to {self.path}: {e}")
+                if tmp_path and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    def _entry(self, platform, group, selector):
+        group_stats = self.stats.setdefault(platform, {}).setdefault(group, {})
+        return group_stats.setdefault(selector_key(selector), {
+            'hits': 0,
+            'misses': 0,
+            'total_time': 0.0,
+            'consecutive_misses': 0,
+        })
+
+    @staticmethod
+    def hit_rate(entry):
+        # Laplace smoothing so unseen selectors sit at 0.5 instead of 0 or 1
+        return (entry['hits'] + 1) / (entry['hits'] + entry['misses'] + 2)
+
+    def is_dominant(self, entry):
+        return entry['hits'] >= DOMINANT_MIN_HITS and self.hit_rate(entry) >= DOMINANT_HIT_RATE
+
+    def ordered(self, platform, group, selectors, tiers=None):
+        """
+        Return selectors in their declared precision tiers, most specific first
+
+        tiers gives each selector's precision (lower is more specific); within
+        a tier the ones that missed on their last attempt move to the back,
+        then they go by hit rate and mean latency. Without tiers every selector
+        is its own tier, so the declared order is kept. Ties keep the given order.
+        """
+        if tiers is None:
+            tiers = range(len(selectors))
+        tier_of = {selector_key(selector): tier for selector, tier in zip(selectors, tiers)}
+
+        with self._lock:
+            group_stats = self.stats.get(platform, {}).get(group, {})
+
+            def sort_key(selector):
+                tier = tier_of[selector_key(selector)]
+                entry = group_stats.get(selector_key(selector))
+                if not entry:
+                    return (tier, False, -0.5, 0.0)
+                attempts = entry['hits'] + entry['misses']
+                return (tier, entry['consecutive_misses'] > 0, -self.hit_rate(entry),
+                        entry['total_time'] / max(1, attempts))
+
+            return sorted(selectors, key=sort_key)
+
+    def record(self, platform, group, selector, hit, elapsed):
+        with self._lock:
+            entry = self._entry(platform, group, selector)
+            was_dominant = self.is_dominant(entry)
+
+            if hit:
+                entry['hits'] += 1
+                entry['consecutive_misses'] = 0
+            else:
+                entry['misses'] += 1
+                entry['consecutive_misses'] += 1
+                if was_dominant and entry['consecutive_misses'] == 1:
+                    if group in SOURCE_GROUPS:
+                        logger.debug(f"No data from {selector_key(selector)!r} ({platform}) "
+                                     f"after {entry['hits']} hits")
+                    else:
+                        logger.warning(
+                            f"Selector {selector_key(selector)!r} ({platform}/{group}) stopped matching "
+                            f"after {entry['hits']} hits - the page layout may have changed"
+                        )
+            entry['total_time'] += elapsed
+            self.dirty = True
+
+    def first_match(self, platform, group, selectors, probe, tiers=None):
+        """
+        Try selectors in learned order and return (selector, result) for the
+        first one whose probe result is truthy, or (None, None) if all miss.
+        tiers is passed to ordered(); selectors are only reordered among
+        equally specific ones. Exceptions raised by the probe count as misses.
+        """
+        for selector in self.ordered(platform, group, selectors, tiers):
+            start = time.perf_counter()
+            try:
+                result = probe(selector)
+            except Exception as e:
+                logger.debug(f"Selector {selector_key(selector)!r} failed: {e}")
+                result = None
+            self.record(platform, group, selector, bool(result), time.perf_counter() - start)
+            if result:
+                return selector, result
+        return None, None
+
+    def summary(self, platform=None):
+        """Per-selector stats rows, best selector of each group first"""
+        rows = []
+        with self._lock:
+            stats = json.loads(json.dumps(self.stats))
+        for platform_name, groups in stats.items():
+            if platform and platform_name != platform:
+                continue
+            for group, entries in groups.items():
+                ranked = self.ordered(platform_name, group, list(entries), tiers=[0] * len(entries))
+                for selector in ranked:
+                    entry = entries[selector]
+                    attempts = entry['hits'] + entry['misses']
+                    rows.append({
+                        'platform': platform_name,
+                        'group': group,
+                        'selector': selector,
+                        'hits': entry['hits'],
+                        'misses': entry['misses'],
+                        'hit_rate': entry['hits'] / attempts if attempts else 0.0,
+                        'mean_ms': entry['total_time'] / attempts * 1000 if attempts else 0.0,
+                    })
+        return rows
+
+
+selector_registry = SelectorRegistry()
+atexit.register(selector_registry.save)
+
+
+if __name__ == "__main__":
+    for row in selector_registry.summary():
+        print(f"{row['platform']:>9} {row['group']:<16} {row['hit_rate']*100:5.1f}% "
+              f"{row['hits']:>5}/{row['hits'] + row['misses']:<5} {row['mean_ms']:7.2f} ms  {row['selector']}")
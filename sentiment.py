@@ -0,0 +1,357 @@
+import atexit
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import PackageNotFoundError, version
+from review_text import normalize_review
+from sentiment_cache import sentiment_cache
+from sentiment_service import sentiment_service
+
+# Polarity above / below these bounds counts as positive / negative
+POSITIVE_THRESHOLD = 0.1
+NEGATIVE_THRESHOLD = -0.1
+
+POSITIVE = "Positive 👍"
+NEUTRAL = "Neutral 😐"
+NEGATIVE = "Negative 👎"
+
+logger = logging.getLogger(__name__)
+
+# Batches smaller than this are scored in-process; a pool round-trip costs more
+PARALLEL_MIN_REVIEWS = 400
+# Reviews per task sent to a worker, large enough to amortize pickling and IPC
+MIN_CHUNK_SIZE = 100
+MAX_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1))
+
+# 'textblob' or the vectorized 'lexicon' scorer; override with COMPARE_IT_SENTIMENT
+SENTIMENT_BACKEND = os.environ.get('COMPARE_IT_SENTIMENT', 'textblob')
+
+# Cached scores are only reused for the analyzer version that produced them
+try:
+    MODEL_VERSION = f"textblob-{version('textblob')}"
+except PackageNotFoundError:
+    MODEL_VERSION = "textblob"
+
+
+def model_version(backend=None):
+    """Cache key component for the scores a backend produces"""
+    if (backend or SENTIMENT_BACKEND) == 'lexicon':
+        from lexicon_sentiment import LEXICON_VERSION
+        return LEXICON_VERSION
+    return MODEL_VERSION
+
+
+def polarity(text):
+    """TextBlob polarity of a review, from -1.0 (negative) to 1.0 (positive)"""
+    return sentiment_service.textblob_scores([text])[0][0]
+
+
+def label_for(score):
+    """Display label for a polarity score"""
+    if score > POSITIVE_THRESHOLD:
+        return POSITIVE
+    if score < NEGATIVE_THRESHOLD:
+        return NEGATIVE
+    return NEUTRAL
+
+
+def _textblob_scores(texts):
+    """(polarity, subjectivity) per text; runs in pool workers as well as in-process"""
+    return sentiment_service.textblob_scores(texts)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+            atexit.register(_pool.shutdown, cancel_futures=True)
+        return _pool
+
+
+def score_texts(texts, parallel=None, backend=None):
+    """
+    (polarity, subjectivity) for every text, in input order
+
+    With the TextBlob backend, large batches are split into chunks and scored
+    across a process pool, small ones in-process. parallel=True/False forces
+    either path; both give identical results, and a pool failure falls back to
+    in-process scoring. The lexicon backend scores the batch in one NumPy pass.
+    """
+    texts = list(texts)
+    if (backend or SENTIMENT_BACKEND) == 'lexicon':
+        from lexicon_sentiment import lexicon_scores
+        return lexicon_scores(texts)
+    if parallel is None:
+        parallel = MAX_WORKERS > 1 and len(texts) >= PARALLEL_MIN_REVIEWS
+    if not parallel or not texts:
+        return _textblob_scores(texts)
+
+    chunk_size = max(MIN_CHUNK_SIZE, -(-len(texts) // (MAX_WORKERS * 4)))
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    try:
+        results = []
+        for chunk_scores in _get_pool().map(_textblob_scores, chunks):
+            results.extend(chunk_scores)
+        return results
+    except Exception as e:
+        logger.warning(f"Parallel sentiment scoring failed, scoring in-process: {e}")
+        return _textblob_scores(texts)
+
+
+def score_records(records, parallel=None, backend=None):
+    """score_texts for NormalizedReviews; the lexicon backend scores their token ids directly"""
+    records = list(records)
+    if (backend or SENTIMENT_BACKEND) == 'lexicon':
+        from lexicon_sentiment import get_scorer
+        return get_scorer().score_records(records)
+    return score_texts([record.clean for record in records], parallel, backend)
+
+
+def score_reviews(reviews, cache=sentiment_cache, backend=None):
+    """
+    Score every review once, reusing scores from the persistent cache
+
+    Returns a list of {'review', 'score', 'subjectivity', 'label'} dicts in
+    input order, which the scrapers keep as scored_reviews so the UI can render
+    them as they are. Pass cache=None to always run the scorer.
+    """
+    model = model_version(backend)
+    records = [normalize_review(review) for review in reviews]
+    known = cache.lookup([record.hash for record in records], model) if cache else {}
+
+    missing = {}
+    for record in records:
+        if record.hash not in known and record.hash not in missing:
+            missing[record.hash] = record
+    computed = dict(zip(missing, score_records(missing.values(), backend=backend)))
+    if cache:
+        cache.store(computed, model)
+
+    scored = []
+    for review, record in zip(reviews, records):
+        score, subjectivity = known.get(record.hash) or computed[record.hash]
+        scored.append({'review': review, 'score': score, 'subjectivity': subjectivity, 'label': label_for(score)})
+    return scored
+
+
+def sentiment_counts(scored):
+    """(positive, neutral, negative) counts of scored reviews"""
+    labels = [row['label'] for row in scored]
+    return labels.count(POSITIVE), labels.count(NEUTRAL), labels.count(NEGATIVE)
+
+
+def threshold_verdict(stats):
+    """Buy at 60% positive, Don't Buy at 40% negative, otherwise mixed (Flipkart)"""
+    return stats.judgement('threshold').text
+
+
+def majority_verdict(stats):
+    """Whichever of positive and negative is more common, ignoring neutral (Amazon)"""
+    return stats.judgement('majority').text
+
+
+def wilson_interval(successes, trials, z=1.96):
+    """Wilson score interval for a proportion; (0, 1) when there are no trials"""
+    if not trials:
+        return 0.0, 1.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    half_width = z * ((p * (1 - p) + z * z / (4 * trials)) / trials) ** 0.5 / denominator
+    return max(0.0, center - half_width), min(1.0, center + half_width)
+
+
+def _per_review(stats):
+    """Factor turning the stats' text counts into counts of independent reviews"""
+    return stats.reviews / stats.total if stats.total else 0.0
+
+
+def threshold_settled(stats, z=1.645):
+    """Reason the threshold_verdict can no longer change, or None"""
+    scale = _per_review(stats)
+    positive_low, positive_high = wilson_interval(stats.positive * scale, stats.reviews, z)
+    negative_low, negative_high = wilson_interval(stats.negative * scale, stats.reviews, z)
+    if positive_low >= 0.6:
+        return f"positive share is at least {positive_low*100:.0f}%, above the 60% Buy threshold"
+    if negative_low >= 0.4:
+        return f"negative share is at least {negative_low*100:.0f}%, above the 40% Don't Buy threshold"
+    if positive_high < 0.6 and negative_high < 0.4:
+        return (f"positive share is at most {positive_high*100:.0f}% and negative share at most "
+                f"{negative_high*100:.0f}%, below both thresholds")
+    return None
+
+
+def majority_settled(stats, z=1.645):
+    """Reason the majority_verdict can no longer change, or None"""
+    scale = _per_review(stats)
+    low, high = wilson_interval(stats.positive * scale, (stats.positive + stats.negative) * scale, z)
+    if low > 0.5:
+        return f"positive reviews are at least {low*100:.0f}% of non-neutral ones"
+    if high < 0.5:
+        return f"negative reviews are at least {(1 - high)*100:.0f}% of non-neutral ones"
+    return None
+
+
+# How to tell that a verdict rule's outcome is settled
+SETTLED_RULES = {threshold_verdict: threshold_settled, majority_verdict: majority_settled}
+# verdict_engine rule behind each verdict function
+ENGINE_RULES = {threshold_verdict: 'threshold', majority_verdict: 'majority'}
+
+
+class SentimentAggregator:
+    """
+    Running sentiment over reviews as they are scraped
+
+    Keeps label counts and the mean and variance of polarity (Welford's
+    method) in constant memory, so a verdict is available after every page.
+    verdict_rule turns the running stats into the verdict string.
+
+    Reviews may carry a weight (e.g. from stratified sampling); counts are
+    then weighted sums and the mean and variance are weighted too.
+
+    reviews counts the independent reviews behind the scores, which is less
+    than total when one review contributes several texts (a Flipkart title
+    and body); settled() bounds are computed over it.
+    """
+
+    def __init__(self, verdict_rule=threshold_verdict):
+        self.verdict_rule = verdict_rule
+        self.positive = 0
+        self.neutral = 0
+        self.negative = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.reviews = 0
+
+    @classmethod
+    def from_state(cls, state, verdict_rule=threshold_verdict):
+        """Aggregator resuming from a state() dict, e.g. one stored with a product"""
+        sentiment = cls(verdict_rule)
+        sentiment.positive, sentiment.neutral, sentiment.negative = state['positive'], state['neutral'], state['negative']
+        sentiment.mean, sentiment._m2 = state['mean'], state['m2']
+        sentiment.reviews = min(state.get('reviews', sentiment.total), sentiment.total)
+        return sentiment
+
+    def state(self):
+        """Running stats as a plain dict; from_state() picks up where this left off"""
+        return {'positive': self.positive, 'neutral': self.neutral, 'negative': self.negative,
+                'mean': self.mean, 'm2': self._m2, 'reviews': self.reviews}
+
+    @property
+    def total(self):
+        return self.positive + self.neutral + self.negative
+
+    @property
+    def variance(self):
+        """Sample variance of polarity"""
+        return self._m2 / (self.total - 1) if self.total > 1 else 0.0
+
+    @property
+    def stdev(self):
+        return self.variance ** 0.5
+
+    def add_score(self, score, weight=1):
+        if weight <= 0:
+            return
+        label = label_for(score)
+        if label == POSITIVE:
+            self.positive += weight
+        elif label == NEGATIVE:
+            self.negative += weight
+        else:
+            self.neutral += weight
+        delta = score - self.mean
+        self.mean += delta * weight / self.total
+        self._m2 += weight * delta * (score - self.mean)
+
+    def add(self, scored, reviews=None):
+        """
+        Fold in rows from score_reviews, honouring an optional 'weight' per row
+
+        reviews is how many independent reviews the rows come from; by
+        default each row is its own review.
+        """
+        added = 0
+        for row in scored:
+            weight = row.get('weight', 1)
+            self.add_score(row['score'], weight)
+            added += max(weight, 0)
+        self.reviews += added if reviews is None else reviews
+
+    def percentages(self):
+        """(positive, neutral, negative) shares in percent"""
+        total = self.total or 1
+        return self.positive / total * 100, self.neutral / total * 100, self.negative / total * 100
+
+    def verdict(self):
+        return self.verdict_rule(self)
+
+    def judgement(self, rule=None):
+        """
+        Structured verdict_engine.Verdict for the running stats
+
+        rule defaults to the engine rule behind verdict_rule; a custom
+        verdict_rule without one gives an UNKNOWN verdict carrying its text.
+        """
+        from verdict_engine import Verdict, judge
+
+        rule = rule or ENGINE_RULES.get(self.verdict_rule)
+        if rule is None:
+            return Verdict.unavailable(self.verdict())
+        return judge([(self.positive, self.neutral, self.negative)], rule, [self.mean])[0]
+
+    def settled(self, z=1.645, min_reviews=10):
+        """
+        Why more reviews would not change the verdict, or None
+
+        True once a one-sided Wilson confidence bound (95% at the default z) on
+        the relevant share clears the verdict rule's threshold, and never
+        before min_reviews independent reviews.
+        """
+        settled_rule = SETTLED_RULES.get(self.verdict_rule)
+        if settled_rule is None or self.reviews < min_reviews:
+            return None
+        return settled_rule(self, z)
+
+    def summary(self):
+        """One line for progress displays"""
+        return (f"{self.verdict()} | {self.total:.0f} reviews, "
+                f"mean polarity {self.mean:+.2f} ± {self.stdev:.2f}")
+
+
+def benchmark(reviews, repeat=100):
+    """Time serial against pooled scoring on a synthetic corpus and check they agree"""
+    corpus = [f"{review} ({i})" for i in range(repeat) for review in reviews]
+
+    start = time.perf_counter()
+    serial = score_texts(corpus, parallel=False)
+    serial_time = time.perf_counter() - start
+
+    score_texts(corpus[:MAX_WORKERS * MIN_CHUNK_SIZE], parallel=True)  # start the workers
+    start = time.perf_counter()
+    pooled = score_texts(corpus, parallel=True)
+    pooled_time = time.perf_counter() - start
+
+    print(f"{len(corpus)} reviews, {MAX_WORKERS} workers")
+    print(f"  serial: {serial_time:.2f}s ({len(corpus)/serial_time:.0f} reviews/s)")
+    print(f"  pooled: {pooled_time:.2f}s ({len(corpus)/pooled_time:.0f} reviews/s)")
+    print(f"  identical output: {serial == pooled}")
+    return serial == pooled
+
+
+if __name__ == "__main__":
+    from review_extractor import parse_page_snapshot
+
+    path = sys.argv[1] if len(sys.argv) > 1 else 'page_source.html'
+    with open(path, encoding='utf-8') as f:
+        records = parse_page_snapshot(f.read(), 'flipkart')['reviews']
+    texts = [text for record in records for text in (record['title'], record['body']) if text]
+    sys.exit(0 if benchmark(texts) else 1)
@@ -0,0 +1,136 @@
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# SQLite only allows this many bound parameters per statement on older builds
+QUERY_CHUNK = 500
+
+
+class SentimentCache:
+    """
+    Persistent memo of sentiment scores keyed by (review hash, model version)
+
+    Entries live in a SQLite file and are evicted least-recently-used once
+    there are more than max_entries. Hits and misses are counted per process
+    and accumulated in the database, so hit_rate() covers every run.
+    """
+
+    def __init__(self, path='sentiment_cache.db', max_entries=100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            # Streamlit reruns the script on other threads; access is serialized by _lock
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS sentiment (
+                    hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    polarity REAL NOT NULL,
+                    subjectivity REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (hash, model)
+                );
+                CREATE INDEX IF NOT EXISTS sentiment_last_used ON sentiment (last_used);
+                CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            """)
+        return self._conn
+
+    def lookup(self, hashes, model):
+        """Cached {hash: (polarity, subjectivity)} for the given hashes"""
+        unique = list(dict.fromkeys(hashes))
+        found = {}
+        try:
+            with self._lock:
+                conn = self._connect()
+                for i in range(0, len(unique), QUERY_CHUNK):
+                    chunk = unique[i:i + QUERY_CHUNK]
+                    rows = conn.execute(
+                        f"SELECT hash, polarity, subjectivity FROM sentiment "
+                        f"WHERE model = ? AND hash IN ({','.join('?' * len(chunk))})",
+                        [model, *chunk]
+                    )
+                    found.update((row[0], (row[1], row[2])) for row in rows)
+
+                now = time.time()
+                conn.executemany(
+                    "UPDATE sentiment SET last_used = ? WHERE hash = ? AND model = ?",
+                    [(now, h, model) for h in found]
+                )
+                self._count(conn, len(found), len(unique) - len(found))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Sentiment cache lookup failed: {e}")
+            return {}
+        return found
+
+    def store(self, scores, model):
+        """Save {hash: (polarity, subjectivity)} and evict the oldest entries past max_entries"""
+        if not scores:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO sentiment VALUES (?, ?, ?, ?, ?)",
+                    [(h, model, polarity, subjectivity, now) for h, (polarity, subjectivity) in scores.items()]
+                )
+                excess = conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute(
+                        "DELETE FROM sentiment WHERE rowid IN "
+                        "(SELECT rowid FROM sentiment ORDER BY last_used LIMIT ?)",
+                        (excess,)
+                    )
+                    logger.info(f"Evicted {excess} least recently used sentiment scores")
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Sentiment cache store failed: {e}")
+
+    def _count(self, conn, hits, misses):
+        self.hits += hits
+        self.misses += misses
+        conn.executemany(
+            "INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            [('hits', hits), ('misses', misses)]
+        )
+
+    def hit_rate(self, lifetime=False):
+        """Share of lookups answered from the cache, this process or (lifetime=True) all runs"""
+        if lifetime:
+            stats = self.stats()
+            hits, misses = stats['hits'], stats['misses']
+        else:
+            hits, misses = self.hits, self.misses
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    def stats(self):
+        """Entry count and lifetime hit/miss counters"""
+        try:
+            with self._lock:
+                conn = self._connect()
+                counters = dict(conn.execute("SELECT name, value FROM counters"))
+                entries = conn.execute("SELECT COUNT(*) FROM sentiment").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.warning(f"Could not read sentiment cache stats: {e}")
+            counters, entries = {}, 0
+        return {'entries': entries, 'hits': counters.get('hits', 0), 'misses': counters.get('misses', 0)}
+
+
+# Shared cache used by sentiment.score_reviews
+sentiment_cache = SentimentCache()
+
+
+if __name__ == "__main__":
+    stats = sentiment_cache.stats()
+    print(f"{stats['entries']} cached scores, {stats['hits']} hits / {stats['misses']} misses "
+          f"({sentiment_cache.hit_rate(lifetime=True)*100:.1f}% lifetime hit rate)")
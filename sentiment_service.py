@@ -0,0 +1,104 @@
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SentimentService:
+    """
+    Process-wide owner of the loaded sentiment models
+
+    Importing textblob and parsing its pattern lexicon happen on the first
+    review a process scores, which makes that review far slower than the
+    rest. The service does both once per process and every call site scores
+    through it. warm() does the loading ahead of time on a background thread,
+    so the app can start it while the user is still typing a search.
+    """
+
+    def __init__(self):
+        self._lexicon = None
+        self._scorer = None
+        self._lock = threading.Lock()
+        self._warm_thread = None
+        # Seconds spent loading each model, for logging and benchmarks
+        self.load_times = {}
+
+    @property
+    def lexicon(self):
+        """TextBlob's pattern sentiment lexicon, imported and parsed on first use"""
+        if self._lexicon is None:
+            with self._lock:
+                if self._lexicon is None:
+                    start = time.perf_counter()
+                    from textblob.en import sentiment as lexicon
+                    'good' in lexicon  # lazydict: the first lookup parses the XML
+                    self.load_times['textblob'] = time.perf_counter() - start
+                    logger.info(f"Loaded TextBlob sentiment lexicon in {self.load_times['textblob']:.2f}s")
+                    self._lexicon = lexicon
+        return self._lexicon
+
+    @property
+    def scorer(self):
+        """Vectorized LexiconScorer built from the same lexicon"""
+        if self._scorer is None:
+            lexicon = self.lexicon
+            with self._lock:
+                if self._scorer is None:
+                    start = time.perf_counter()
+                    from lexicon_sentiment import LexiconScorer
+                    self._scorer = LexiconScorer(lexicon)
+                    self.load_times['lexicon'] = time.perf_counter() - start
+                    logger.info(f"Built vectorized sentiment scorer in {self.load_times['lexicon']:.2f}s")
+        return self._scorer
+
+    def textblob_scores(self, texts):
+        """(polarity, subjectivity) per text, the same as TextBlob(text).sentiment"""
+        lexicon = self.lexicon
+        return [tuple(lexicon(text)) for text in texts]
+
+    def warm(self, backend='textblob', background=True):
+        """
+        Load the models for backend now instead of on the first review
+
+        With background=True the loading runs on a daemon thread and this
+        returns at once; scoring calls made meanwhile wait for it. Calling
+        warm() again is cheap, so it is safe on every Streamlit rerun.
+        """
+        def load():
+            try:
+                self.scorer if backend == 'lexicon' else self.lexicon
+            except Exception as e:
+                logger.warning(f"Could not preload sentiment models: {e}")
+
+        if not background:
+            load()
+            return None
+        if self._warm_thread is None or (not self._warm_thread.is_alive() and not self.ready(backend)):
+            self._warm_thread = threading.Thread(target=load, name='sentiment-warmup', daemon=True)
+            self._warm_thread.start()
+        return self._warm_thread
+
+    def ready(self, backend='textblob'):
+        """True once scoring with backend no longer has to load anything"""
+        return (self._scorer if backend == 'lexicon' else self._lexicon) is not None
+
+
+# Shared service used by sentiment and lexicon_sentiment
+sentiment_service = SentimentService()
+
+
+if __name__ == "__main__":
+    # Cold model load against the first score once the models are warm
+    review = sys.argv[1] if len(sys.argv) > 1 else "Very good phone, battery could be better"
+
+    start = time.perf_counter()
+    sentiment_service.warm(background=False)
+    cold = time.perf_counter() - start
+
+    start = time.perf_counter()
+    score = sentiment_service.textblob_scores([review])[0]
+    warm = time.perf_counter() - start
+
+    print(f"cold load: {cold*1000:.0f} ms, first score after warm-up: {warm*1000:.2f} ms, score {score}")
@@ -0,0 +1,66 @@
+import heapq
+import itertools
+import re
+from product_identity import product_key
+
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def relevance(search_term, title):
+    """Fraction of search-term tokens that appear in the title (0.0 - 1.0)"""
+    query_tokens = set(TOKEN_PATTERN.findall(search_term.lower()))
+    if not query_tokens:
+        return 0.0
+    title_tokens = set(TOKEN_PATTERN.findall(title.lower()))
+    return len(query_tokens & title_tokens) / len(query_tokens)
+
+
+class TopKProducts:
+    """
+    Keeps the best k products seen so far in a bounded heap, so any number of
+    listings can be streamed through in O(k) memory.
+
+    Products rank by lowest price. With by='relevance' they rank by relevance
+    to the search term first and price second. Listings below min_relevance
+    are dropped, and links to the same product (by product_key) are only
+    counted once.
+    """
+
+    def __init__(self, k, search_term='', by='price', min_relevance=0.0):
+        self.k = k
+        self.search_term = search_term
+        self.by = by
+        self.min_relevance = min_relevance
+        self.heap = []
+        self.keys = set()
+        self.seen = 0
+        self._counter = itertools.count()
+
+    def _rank(self, price, score):
+        # heapq is a min-heap, so the worst kept product must have the smallest key
+        if self.by == 'relevance':
+            return (score, -price)
+        return (-price,)
+
+    def push(self, title, price, link):
+        self.seen += 1
+        key = product_key(link)
+        if price == float('inf') or key in self.keys:
+            return
+
+        score = relevance(self.search_term, title) if self.search_term else 1.0
+        if score < self.min_relevance:
+            return
+
+        entry = (self._rank(price, score), next(self._counter), link, title, price, key)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+            self.keys.add(key)
+        elif entry[0] > self.heap[0][0]:
+            evicted = heapq.heapreplace(self.heap, entry)
+            self.keys.discard(evicted[5])
+            self.keys.add(key)
+
+    def results(self):
+        """Best products first, as [title, price, link] rows"""
+        return [[title, price, link] for _, _, link, title, price, _ in sorted(self.heap, reverse=True)]
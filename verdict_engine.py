@@ -0,0 +1,202 @@
+import sys
+import time
+import numpy as np
+from sentiment import NEGATIVE_THRESHOLD, POSITIVE_THRESHOLD
+
+# Verdict actions
+BUY = 'buy'
+DONT_BUY = 'dont_buy'
+MIXED = 'mixed'
+UNKNOWN = 'unknown'
+
+# Verdict rules by name:
+#   threshold - Buy at 60% positive, Don't Buy at 40% negative (Flipkart)
+#   majority  - whichever of positive and negative is more common (Amazon)
+THRESHOLD = 'threshold'
+MAJORITY = 'majority'
+
+BUY_SHARE = 60
+DONT_BUY_SHARE = 40
+
+# Display text per rule and action, filled from Verdict fields
+TEMPLATES = {
+    THRESHOLD: {
+        UNKNOWN: "No reviews available for analysis",
+        BUY: "Buy ✅ ({positive:.0f}/{total:.0f} or {positive_share:.1f}% reviews are positive)",
+        DONT_BUY: "Don't Buy ❌ ({negative:.0f}/{total:.0f} or {negative_share:.1f}% reviews are negative)",
+        MIXED: "Consider with Caution ⚠️ (Mixed reviews - {positive_share:.1f}% positive, "
+               "{negative_share:.1f}% negative, {neutral_share:.1f}% neutral)",
+    },
+    MAJORITY: {
+        UNKNOWN: "No reviews found to analyze",
+        BUY: "Buy ✅ ({polar_positive_share:.1f}% positive reviews)",
+        DONT_BUY: "Don't Buy ❌ ({polar_negative_share:.1f}% negative reviews)",
+        MIXED: "Neutral ⚖️ (Equal positive and negative sentiment)",
+    },
+}
+
+# Actions in order of preference when ranking products
+ACTION_RANK = {BUY: 0, MIXED: 1, UNKNOWN: 2, DONT_BUY: 3}
+
+
+class Verdict:
+    """
+    Buy/Don't Buy outcome for one product
+
+    action is one of BUY, DONT_BUY, MIXED or UNKNOWN, so callers branch on it
+    instead of matching the display text. Counts may be weighted sums.
+    confidence is a Wilson lower bound on the share of positive reviews
+    (out of all reviews for the threshold rule, out of non-neutral ones for
+    the majority rule), used to rank products.
+    """
+
+    def __init__(self, action, text, rule=None, positive=0, neutral=0, negative=0,
+                 mean=None, confidence=0.0):
+        self.action = action
+        self.text = text
+        self.rule = rule
+        self.positive = positive
+        self.neutral = neutral
+        self.negative = negative
+        self.mean = mean
+        self.confidence = confidence
+
+    @classmethod
+    def unavailable(cls, text="Unable to determine"):
+        """Verdict for a product whose reviews could not be analyzed"""
+        return cls(UNKNOWN, text)
+
+    @property
+    def total(self):
+        return self.positive + self.neutral + self.negative
+
+    @property
+    def buy(self):
+        return self.action == BUY
+
+    @property
+    def dont_buy(self):
+        return self.action == DONT_BUY
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"Verdict({self.action!r}, {self.text!r})"
+
+
+def wilson_lower_bounds(successes, trials, z=1.96):
+    """Lower Wilson score bounds for arrays of proportions; 0 where there are no trials"""
+    successes = np.asarray(successes, dtype=float)
+    trials = np.asarray(trials, dtype=float)
+    n = np.maximum(trials, 1)
+    p = successes / n
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    half_width = z * np.sqrt((p * (1 - p) + z * z / (4 * n)) / n) / denominator
+    return np.where(trials > 0, np.clip(center - half_width, 0.0, 1.0), 0.0)
+
+
+def judge(counts, rule=THRESHOLD, means=None):
+    """
+    Verdicts for many products at once
+
+    counts is an (n, 3) array-like of (positive, neutral, negative) review
+    counts, one row per product; means, if given, their mean polarities.
+    The rule is applied to all rows with NumPy; only the Verdict objects and
+    their text are built per product.
+    """
+    counts = np.asarray(counts, dtype=float).reshape(-1, 3)
+    positive, neutral, negative = counts.T
+    total = counts.sum(axis=1)
+    shares = counts / np.maximum(total, 1)[:, None] * 100
+    polar = positive + negative
+    polar_shares = counts[:, [0, 2]] / np.maximum(polar, 1)[:, None] * 100
+
+    if rule == THRESHOLD:
+        actions = np.select(
+            [total == 0, shares[:, 0] >= BUY_SHARE, shares[:, 2] >= DONT_BUY_SHARE],
+            [UNKNOWN, BUY, DONT_BUY], MIXED
+        )
+        confidence = wilson_lower_bounds(positive, total)
+    elif rule == MAJORITY:
+        actions = np.select(
+            [total == 0, positive > negative, negative > positive],
+            [UNKNOWN, BUY, DONT_BUY], MIXED
+        )
+        confidence = wilson_lower_bounds(positive, polar)
+    else:
+        raise ValueError(f"Unknown verdict rule: {rule}")
+
+    templates = TEMPLATES[rule]
+    verdicts = []
+    for i, action in enumerate(actions.tolist()):
+        fields = {
+            'positive': positive[i], 'neutral': neutral[i], 'negative': negative[i], 'total': total[i],
+            'positive_share': shares[i, 0], 'neutral_share': shares[i, 1], 'negative_share': shares[i, 2],
+            'polar_positive_share': polar_shares[i, 0], 'polar_negative_share': polar_shares[i, 1],
+        }
+        verdicts.append(Verdict(
+            action, templates[action].format(**fields), rule,
+            positive[i].item(), neutral[i].item(), negative[i].item(),
+            None if means is None else float(means[i]), confidence[i].item()
+        ))
+    return verdicts
+
+
+def judge_scores(score_arrays, rule=THRESHOLD, weights=None):
+    """
+    Verdicts for many products from their review polarity scores
+
+    score_arrays holds one sequence of polarity scores per product, and
+    weights, if given, matching per-review weights. All reviews are labelled
+    and counted per product in a single pass over the concatenated scores.
+    """
+    lengths = np.array([len(scores) for scores in score_arrays], dtype=np.int64)
+    products = np.repeat(np.arange(len(lengths)), lengths)
+    scores = np.concatenate([np.zeros(0)] + [np.asarray(s, dtype=float) for s in score_arrays])
+    if weights is None:
+        review_weights = np.ones(len(scores))
+    else:
+        review_weights = np.concatenate([np.zeros(0)] + [np.asarray(w, dtype=float) for w in weights])
+
+    # 0 = positive, 1 = neutral, 2 = negative, as in the counts columns
+    labels = np.where(scores > POSITIVE_THRESHOLD, 0, np.where(scores < NEGATIVE_THRESHOLD, 2, 1))
+    counts = np.zeros((len(lengths), 3))
+    np.add.at(counts, (products, labels), review_weights)
+
+    weight_sums = np.bincount(products, weights=review_weights, minlength=len(lengths))
+    score_sums = np.bincount(products, weights=scores * review_weights, minlength=len(lengths))
+    means = np.divide(score_sums, weight_sums, out=np.zeros(len(lengths)), where=weight_sums > 0)
+    return judge(counts, rule, means)
+
+
+def rank_products(score_arrays, rule=THRESHOLD, weights=None):
+    """
+    Indices of products from best to worst by review sentiment, and their verdicts
+
+    Products are ordered by action (Buy, mixed, unknown, Don't Buy), then by
+    confidence, so a product with few but glowing reviews does not outrank
+    one with many good ones.
+    """
+    verdicts = judge_scores(score_arrays, rule, weights)
+    actions = np.array([ACTION_RANK[verdict.action] for verdict in verdicts])
+    confidence = np.array([verdict.confidence for verdict in verdicts])
+    order = np.lexsort((-confidence, actions))
+    return order.tolist(), verdicts
+
+
+if __name__ == "__main__":
+    # Rank synthetic candidate products, e.g. python verdict_engine.py 50
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rng = np.random.default_rng(0)
+    products = [np.clip(rng.normal(rng.uniform(-0.3, 0.5), 0.3, rng.integers(0, 200)), -1, 1)
+                for _ in range(count)]
+
+    for rule in (THRESHOLD, MAJORITY):
+        start = time.perf_counter()
+        order, verdicts = rank_products(products, rule)
+        elapsed = time.perf_counter() - start
+        print(f"{rule}: ranked {count} products ({sum(map(len, products))} reviews) in {elapsed*1000:.1f} ms")
+        for i in order[:3]:
+            print(f"  #{i}: {verdicts[i]} (confidence {verdicts[i].confidence:.2f})")